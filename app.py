@@ -1,6 +1,8 @@
 import streamlit as st
 import pandas as pd
 import os
+from utils.metrics import start_exporters, timed
+from utils.prewarm import start_prewarm, show_prewarm_status
 
 # Sidebar Navigation
 def navigate():
@@ -38,36 +40,46 @@ def navigate():
         if st.button("Upload & Analyze"):
             st.session_state.page = "general_analysis"
 
+    # Background prewarm progress
+    show_prewarm_status()
+
 # Run the selected page
 def run_page():
     if 'page' not in st.session_state:
         st.session_state.page = "home"
 
-    if st.session_state.page == "home":
+    # Rerun duration per page, exported by utils.metrics
+    with timed("eternals_page_rerun_seconds", page=st.session_state.page):
+        show_page(st.session_state.page)
+
+def show_page(page):
+    if page == "home":
         from modules.home import display_home
         display_home()
-    elif st.session_state.page == "master_data":
+    elif page == "master_data":
         from modules.master_data import display_master_data
         display_master_data()
-    elif st.session_state.page == "order_creation":
+    elif page == "order_creation":
         from modules.order_creation import display_order_creation
         display_order_creation()
-    elif st.session_state.page == "excel_ranking":
+    elif page == "excel_ranking":
         from modules.excel_ranking import display_excel_ranking
         display_excel_ranking()
-    elif st.session_state.page == "order_comparison":
+    elif page == "order_comparison":
         from modules.comparison import display_comparison
         display_comparison()
-    elif st.session_state.page == "Cutoff_Analysis":
+    elif page == "Cutoff_Analysis":
         from modules.cutoff_Analysis import display_cutoff_Analysis
         display_cutoff_Analysis()
-    elif st.session_state.page == "general_analysis":
+    elif page == "general_analysis":
         from modules.general_analysis_dashboard import display_general_analysis
         display_general_analysis()
 
 # Main app logic
 def main():
     st.set_page_config(page_title="ETERNALS", layout="wide")
+    start_exporters()
+    start_prewarm()
     navigate()
     run_page()
 
@@ -1,50 +1,32 @@
 import streamlit as st
 import pandas as pd
-import os
+from utils.shared_frames import master_text_view, master_signature, shared_derived
+from utils.uploads import read_upload, content_hash
+from utils.gap_analysis import CUTOFF_COLUMNS, gap_analysis, gap_summary
+from utils.exports import export_buttons
+from utils.batch_comparison import ORDERS_ROOT, prepare_comparison_sheet, validation_report_sheets, collect_order_files, batch_compare, overlap_matrix
 
 def display_comparison():
     st.title("Order Comparison Dashboard")
 
-    # Path to the master file
-    MASTER_FILE = os.path.join('data', 'MASTER EXCEL.xlsx')
-
-    if not os.path.exists(MASTER_FILE):
-        st.error(f"Master file '{MASTER_FILE}' is missing in the 'data/' folder!")
+    # Shared read-only master as text, MAIN CODE included (versioned store if initialised, else MASTER EXCEL)
+    try:
+        master_sheet = master_text_view()
+    except FileNotFoundError as e:
+        st.error(str(e))
         return
 
-    master_sheet = pd.read_excel(MASTER_FILE, sheet_name='Sheet1', dtype=str)
+    mode = st.radio("Comparison Mode:", options=["Single File", "Batch"], horizontal=True)
+    if mode == "Batch":
+        display_batch_comparison(master_sheet)
+        return
 
     # File upload section
     uploaded_file = st.file_uploader("Upload Comparison File (Excel)", type=["xlsx"])
 
     if uploaded_file:
         try:
-            comparison_sheet = pd.read_excel(uploaded_file, sheet_name='Sheet1', dtype=str)
-
-            # Rename columns in the uploaded file
-            expected_columns = [
-                "MCC College Code",
-                "College Name",
-                "COURSE CODE",
-                "Program",
-                "Quota",
-                "TYPE",
-                "Student Order"
-            ]
-
-            if len(comparison_sheet.columns) < len(expected_columns):
-                st.error("Uploaded file must have at least 7 columns.")
-                return
-
-            comparison_sheet.rename(columns=dict(zip(comparison_sheet.columns[:7], expected_columns)), inplace=True)
-
-            # Clean and process Student Order
-            comparison_sheet['Student Order'] = pd.to_numeric(comparison_sheet['Student Order'], errors='coerce')
-            comparison_sheet.sort_values(by='Student Order', inplace=True)
-
-            # Create MAIN CODE
-            comparison_sheet['MAIN CODE'] = comparison_sheet['MCC College Code'].str.strip() + "_" + comparison_sheet['COURSE CODE'].str.strip() + "_" + comparison_sheet['Quota'].str.strip()
-            master_sheet['MAIN CODE'] = master_sheet['MCC College Code'].str.strip() + "_" + master_sheet['COURSE CODE'].str.strip() + "_" + master_sheet['Quota'].str.strip()
+            comparison_sheet = prepare_comparison_sheet(read_upload(uploaded_file, sheet_names=['Sheet1'], dtype=str)['Sheet1'])
 
             # Merge data based on MAIN CODE
             merged_data = pd.merge(comparison_sheet, master_sheet, on='MAIN CODE', how='left', suffixes=('_uploaded', '_master'))
@@ -71,13 +53,70 @@ def display_comparison():
                 display_unique_tables(merged_data)
 
             with tab5:
-                display_fee_cutoff_data(merged_data)
+                display_fee_cutoff_data(merged_data, content_hash(uploaded_file.getvalue()))
 
+        except ValueError as e:
+            st.error(str(e))
         except Exception as e:
             st.error(f"An error occurred while processing the uploaded file: {e}")
     else:
         st.info("Please upload an Excel file for comparison.")
 
+def display_batch_comparison(master_sheet):
+    st.write("### Batch Comparison")
+
+    zip_file = st.file_uploader("Upload Student Order Files (Zip of Excel files)", type=["zip"])
+    folder = None
+    if ORDERS_ROOT:
+        folder = st.text_input(f"Or read order files from a folder under '{ORDERS_ROOT}':", value="")
+
+    if not zip_file and not folder:
+        st.info("Please upload a zip file containing student order files.")
+        return
+
+    if st.button("Run Batch Comparison"):
+        try:
+            files = collect_order_files(zip_file=zip_file, folder=folder or None)
+        except ValueError as e:
+            st.error(str(e))
+            return
+        if not files:
+            st.warning("No Excel files found.")
+            return
+        with st.spinner(f"Comparing {len(files)} files..."):
+            st.session_state.batch_comparison = batch_compare(files, master_sheet)
+
+    if 'batch_comparison' not in st.session_state:
+        return
+
+    summary, codes_by_file = st.session_state.batch_comparison
+
+    st.write("### Per-File Summary")
+    failed = summary[summary['Error'].notna()]
+    if not failed.empty:
+        st.warning(f"{len(failed)} file(s) could not be processed.")
+    summary.index = range(1, len(summary) + 1)
+    st.dataframe(summary)
+    st.download_button(
+        label="Download Summary as CSV",
+        data=summary.to_csv(index=False),
+        file_name="batch_comparison_summary.csv",
+        mime="text/csv"
+    )
+
+    shared, jaccard = overlap_matrix(codes_by_file)
+    if not shared.empty:
+        st.write("### Overlap Matrix")
+        metric = st.radio("Show:", options=["Jaccard Similarity", "Shared MAIN CODEs"], horizontal=True)
+        matrix = jaccard if metric == "Jaccard Similarity" else shared
+        st.dataframe(matrix)
+        st.download_button(
+            label="Download Overlap Matrix as CSV",
+            data=matrix.to_csv(),
+            file_name="batch_overlap_matrix.csv",
+            mime="text/csv"
+        )
+
 def display_merged_data(merged_data):
     st.write("### Merged Data")
     merged_data.index = range(1, len(merged_data) + 1)
@@ -93,7 +132,7 @@ def display_summary_table(merged_data):
     summary_table.insert(0, 'Student_Order_Ranges', summary_table.pop('Student_Order_Ranges'))
     summary_table['Student_Order_From'] = summary_table['Student_Order_Ranges'].str.extract(r'^([\d]+)', expand=False).astype(float)
     summary_table['Student_Order_To'] = summary_table['Student_Order_Ranges'].str.extract(r'([\d]+)$', expand=False).astype(float)
-    summary_table['Student_Order_To'].fillna(summary_table['Student_Order_From'], inplace=True)
+    summary_table['Student_Order_To'] = summary_table['Student_Order_To'].fillna(summary_table['Student_Order_From'])
 
     summary_table = summary_table.sort_values(by=['Student_Order_From', 'Student_Order_To']).reset_index(drop=True)
     summary_table.index = range(1, len(summary_table) + 1)
@@ -139,6 +178,9 @@ def display_validation(comparison_sheet, master_sheet, merged_data):
         else:
             st.success("No missing values found in the merged data!")
 
+    st.write("#### Export Validation Report")
+    export_buttons("Validation Report", validation_report_sheets(comparison_sheet, master_sheet, merged_data), "comparison_validation")
+
 def display_unique_tables(merged_data):
     st.write("### Unique Tables")
 
@@ -219,7 +261,7 @@ def display_unique_tables(merged_data):
         else:
             st.warning("Column 'COURSE TYPE' not found in the merged data.")
 
-def display_fee_cutoff_data(merged_data):
+def display_fee_cutoff_data(merged_data, upload_key):
     st.write("### Fee and Cutoff Data")
     fee_cutoff_table = merged_data[[
         'College Name_master', 'Program_uploaded', 'TYPE_uploaded', 'Student Order', 'Fees', 'OC CUTOFF', 'EWS CUTOFF', 'OBC CUTOFF', 'SC CUTOFF', 'ST CUTOFF', 'SERVICE YEARS'
@@ -256,6 +298,36 @@ def display_fee_cutoff_data(merged_data):
         selected_column: "{:.0f}" if selected_column != 'SERVICE YEARS' else "{}"
     }))
 
+    display_gap_analysis(merged_data, upload_key)
+
+def display_gap_analysis(merged_data, upload_key):
+    st.write("### Cutoff Gap Analysis")
+    col1, col2 = st.columns(2)
+    with col1:
+        air = st.number_input("Student AIR:", min_value=1, value=10000, step=1, key="gap_air")
+    with col2:
+        category = st.selectbox("Student Category:", options=list(CUTOFF_COLUMNS), key="gap_category")
+
+    # One pass over the whole order, shared per (upload, master version, AIR, category)
+    options = shared_derived(
+        ("gap_analysis", upload_key, master_signature(), int(air), category),
+        lambda: gap_analysis(merged_data, int(air), category),
+        cache="gap"
+    )
+
+    summary = gap_summary(options)
+    st.dataframe(pd.DataFrame([summary]), hide_index=True)
+    if summary["Dead"]:
+        st.warning(f"{summary['Dead']} options with a cutoff above AIR {int(air)} are ranked above reachable options.")
+
+    show = st.radio("Show:", options=["All", "Reachable", "Dead", "Unreachable", "No Cutoff"], horizontal=True, key="gap_show")
+    shown = options if show == "All" else options[options['Status'] == show]
+    st.dataframe(shown.style.format({
+        'Student Order': "{:.0f}",
+        CUTOFF_COLUMNS[category]: "{:.0f}",
+        'Margin': "{:+.0f}",
+    }, na_rep="-"))
+
 def split_ranges(lst):
     if not lst:
         return ""
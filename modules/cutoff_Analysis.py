@@ -1,51 +1,72 @@
 import streamlit as st
 import pandas as pd
-import os
 import seaborn as sns
 import matplotlib.pyplot as plt
 import textwrap
 import plotly.express as px
+from utils.allotment_store import AllotmentStore
+from utils.eligibility import join_master, join_order
+from utils.utils import master_columns
+from utils.shared_frames import clear_allotments, normalized_master_view
+from utils.cutoff_data import cutoff_data, cutoff_pivot, remarks_matrix, eligibility_engine, cutoff_cube_sheets, typed_cutoff_data, cutoff_value_sets, value_options
+from utils.exports import export_data, export_buttons
 
 def display_cutoff_Analysis():
     st.title("NEET AIQ Analysis Dashboard")
 
-    # Load the AIQR2 Excel file
-    file_path = os.path.join('data', 'AIQR2.xlsx')
-
-    if not os.path.exists(file_path):
-        st.error("AIQR2 file is missing in the 'data/' folder!")
-        return
-
-    # Load the data
+    # Allotment store partitioned by year / round / quota (seeded from data/AIQR2.xlsx)
+    store = AllotmentStore()
     try:
-        aiqr2_data = pd.read_excel(file_path, sheet_name='Sheet1')
+        store.ensure_seeded()
     except Exception as e:
         st.error(f"Error loading the AIQR2 data: {e}")
         return
 
-    # Clean and prepare data
-    aiqr2_data.fillna("-", inplace=True)
+    with st.expander("Ingest Allotment Workbook", expanded=False):
+        round_file = st.file_uploader("Upload Round Allotment File (Excel)", type=["xlsx"], key="allotment_round_file")
+        col1, col2 = st.columns(2)
+        with col1:
+            ingest_year = st.number_input("Year:", min_value=2000, max_value=2100, value=2024, step=1)
+        with col2:
+            ingest_round = st.number_input("Round (0 = detect from columns):", min_value=0, max_value=10, value=0, step=1)
+        if round_file and st.button("Ingest Workbook"):
+            try:
+                rows = store.ingest(round_file, int(ingest_year), int(ingest_round) or None)
+                clear_allotments()
+                st.success(f"Ingested {rows} rows.")
+            except ValueError as e:
+                st.error(f"Could not ingest workbook: {e}")
 
-    # Ensure NEET AIR is numeric for proper sorting and calculations
-    aiqr2_data['NEET AIR'] = pd.to_numeric(aiqr2_data['NEET AIR'], errors='coerce')
-    aiqr2_data['NEET AIR'] = aiqr2_data['NEET AIR'].apply(lambda x: int(x) if pd.notnull(x) else '-')
+    partitions = store.partitions()
+    if partitions.empty:
+        st.error("No allotment data found. Add AIQR2.xlsx to the 'data/' folder or ingest a round workbook.")
+        return
 
-    # Collapse AFMS-related remarks
-    aiqr2_data['R2 Final Remarks'] = aiqr2_data['R2 Final Remarks'].replace(
-        to_replace=r'Fresh Allotted in 2nd Round\( AFMS Rank : \d+ \)', 
-        value='Fresh Allotted in 2nd Round (AFMS)', 
-        regex=True
-    )
+    # Only the selected year / round partitions are read
+    col1, col2 = st.columns(2)
+    with col1:
+        years = st.multiselect("Select Years:", options=sorted(partitions['year'].unique()), default=[partitions['year'].max()])
+    with col2:
+        available_rounds = sorted(partitions.loc[partitions['year'].isin(years), 'round'].unique())
+        rounds = st.multiselect("Select Rounds:", options=available_rounds, default=available_rounds[-1:])
 
-    # Replace '-' in R1 Remarks with 'R1 Not Allotted'
-    aiqr2_data['R1 Remarks'] = aiqr2_data['R1 Remarks'].replace('-', 'R1 Not Allotted')
+    if not years or not rounds:
+        st.warning("Please select at least one year and one round.")
+        return
+
+    # Cleaned allotments (see utils.cutoff_data), usually already warm from startup
+    aiqr2_data = cutoff_data(tuple(years), tuple(rounds))
+    if aiqr2_data.empty:
+        st.warning("No allotments found for the selected years and rounds.")
+        return
 
     # Tabs for analysis
-    tab1, tab2, tab3, tab4 = st.tabs([
+    tab1, tab2, tab3, tab4, tab5 = st.tabs([
         "Course and Category Analysis",
         "Remarks Analysis",
         "Comparison Analysis",
-        "Interactive Plotly Graphs"
+        "Interactive Plotly Graphs",
+        "Rank Eligibility"
     ])
 
     # Tab 1: Course and Category Analysis
@@ -53,59 +74,53 @@ def display_cutoff_Analysis():
         st.write("### Course and Category Analysis")
 
         # Dropdown filters
-        quota_filter = st.selectbox("Select Quota for Filtering:", aiqr2_data['R2 Final Allotted Quota'].unique())
-        filtered_data = aiqr2_data[aiqr2_data['R2 Final Allotted Quota'] == quota_filter]
+        quota_filter = st.selectbox("Select Quota for Filtering:", aiqr2_data['Allotted Quota'].unique())
+        filtered_data = aiqr2_data[aiqr2_data['Allotted Quota'] == quota_filter]
 
         category_order = ["Open", "EWS", "OBC", "SC", "ST"]
-        remaining_categories = [cat for cat in filtered_data['R2 Final Alloted Category'].unique() if cat not in category_order]
+        remaining_categories = [cat for cat in filtered_data['Allotted Category'].unique() if cat not in category_order]
         category_order += remaining_categories
 
-        # Create a pivot table for max NEET AIR by R2 Final Course and R2 Final Alloted Category
-        pivot_table = filtered_data.pivot_table(
-            values='NEET AIR', 
-            index='R2 Final Course', 
-            columns='R2 Final Alloted Category', 
-            aggfunc='max', 
-            fill_value=0
-        )
+        # Create a pivot table for max NEET AIR by Course and Allotted Category
+        # (computed once per selection and shared across sessions)
+        pivot_table = cutoff_pivot(tuple(years), tuple(rounds), quota_filter)
 
         # Reorder columns to match the category order
         pivot_table = pivot_table[[col for col in category_order if col in pivot_table.columns]]
 
         # Convert NEET AIR values to integers for display
-        pivot_table = pivot_table.applymap(lambda x: int(x) if pd.notnull(x) and x != 0 else x)
+        pivot_table = pivot_table.map(lambda x: int(x) if pd.notnull(x) and x != 0 else x)
 
         st.write(f"### Pivot Table: Maximum NEET AIR by Course and Category (Quota: {quota_filter})")
         st.dataframe(pivot_table)
 
+        # Closing/opening ranks for every quota (shared cache); files are written when downloaded
+        st.write("#### Export Cutoff Cube (All Quotas)")
+        export_buttons("Cutoff Cube", cutoff_cube_sheets(tuple(years), tuple(rounds)), "cutoff_cube", index=True)
+
     # Tab 2: Remarks Analysis
     with tab2:
         st.write("### Remarks Analysis")
 
         # Display combined remarks table
-        combined_remarks_analysis = aiqr2_data.groupby(['R1 Remarks', 'R2 Final Remarks']).size().reset_index(name='Count')
-        st.write("#### Combined R1 and R2 Remarks Analysis Table")
+        combined_remarks_analysis, pivot_data = remarks_matrix(tuple(years), tuple(rounds))
+        st.write("#### Combined Previous and Final Remarks Analysis Table")
         st.dataframe(combined_remarks_analysis)
 
         # Heatmap for combined remarks
-        st.write("#### Heatmap: R1 to R2 Remarks Transition")
-        pivot_data = combined_remarks_analysis.pivot(
-            index='R1 Remarks', columns='R2 Final Remarks', values='Count'
-        ).fillna(0)
-
+        st.write("#### Heatmap: Previous to Final Remarks Transition")
         fig, ax = plt.subplots(figsize=(12, 8), dpi=150)
         sns.heatmap(pivot_data, annot=True, fmt=".0f", cmap="YlGnBu", linewidths=0.5, ax=ax)
-        ax.set_title("R1 to R2 Remarks Transition Heatmap", fontsize=16)
-        ax.set_xlabel("R2 Final Remarks", fontsize=12)
-        ax.set_ylabel("R1 Remarks", fontsize=12)
+        ax.set_title("Previous to Final Remarks Transition Heatmap", fontsize=16)
+        ax.set_xlabel("Final Remarks", fontsize=12)
+        ax.set_ylabel("Previous Round Remarks", fontsize=12)
         st.pyplot(fig)
 
         # Export functionality
         st.write("#### Export Analysis Data")
-        export_data = combined_remarks_analysis.to_csv(index=False)
         st.download_button(
             label="Download Combined Remarks Data as CSV",
-            data=export_data,
+            data=export_data([("Remarks", combined_remarks_analysis)], "csv"),
             file_name="combined_remarks_analysis.csv",
             mime="text/csv"
         )
@@ -114,34 +129,52 @@ def display_cutoff_Analysis():
     with tab3:
         st.write("### Comparison Analysis")
         
-        # Dynamic filtering
-        filtered_data = aiqr2_data.copy()
+        # Dynamic filtering over the typed allotments ('-' in NEET AIR etc. read as
+        # missing); each filter narrows the options offered by the ones after it
+        typed_data = typed_cutoff_data(tuple(years), tuple(rounds))
+        value_sets = cutoff_value_sets(tuple(years), tuple(rounds))
+        mask = pd.Series(True, index=typed_data.index)
         filter_columns = st.multiselect("Select Columns to Filter:", options=aiqr2_data.columns)
 
         # Display active filters
         active_filters = []
         for column in filter_columns:
-            if aiqr2_data[column].dtype == 'object':
-                unique_values = filtered_data[column].unique()
-                selected_values = st.multiselect(f"Filter values in {column}:", options=unique_values)
-                if selected_values:
-                    filtered_data = filtered_data[filtered_data[column].isin(selected_values)]
-                    active_filters.append(f"{column}: {', '.join(map(str, selected_values))}")
-            elif pd.api.types.is_numeric_dtype(aiqr2_data[column]):
+            if column not in value_sets:
+                values = typed_data.loc[mask, column]
+                low, high = values.min(), values.max()
+                if pd.isna(low):
+                    st.caption(f"No {column} values left to filter.")
+                    continue
+                low, high = float(low), float(high)
+                if low == high:
+                    st.caption(f"{column}: {low:g} (only value)")
+                    continue
                 min_val, max_val = st.slider(
                     f"Select range for {column}:",
-                    min_value=float(filtered_data[column].min()),
-                    max_value=float(filtered_data[column].max()),
-                    value=(float(filtered_data[column].min()), float(filtered_data[column].max()))
+                    min_value=low,
+                    max_value=high,
+                    value=(low, high)
                 )
-                filtered_data = filtered_data[(filtered_data[column] >= min_val) & (filtered_data[column] <= max_val)]
-                active_filters.append(f"{column}: {min_val} to {max_val}")
+                # The full range keeps rows without a value ('-')
+                if (min_val, max_val) != (low, high):
+                    mask &= typed_data[column].between(min_val, max_val)
+                    active_filters.append(f"{column}: {min_val:g} to {max_val:g}")
+            else:
+                # Cached options while no filter is applied, else those left in the mask
+                options = value_options(value_sets[column], mask.to_numpy() if active_filters else None)
+                selected_values = st.multiselect(f"Filter values in {column}:", options=options)
+                if selected_values:
+                    mask &= typed_data[column].isin(selected_values)
+                    active_filters.append(f"{column}: {', '.join(map(str, selected_values))}")
+
+        filtered_data = typed_data[mask]
+        st.caption(f"{len(filtered_data)} of {len(typed_data)} allotments" + (f" ({'; '.join(active_filters)})" if active_filters else ""))
 
         # Scatter plot customization
         st.write("### Customize Scatter Plot")
-        y_axis_column = st.selectbox("Select Y-Axis:", options=aiqr2_data.columns, index=aiqr2_data.columns.get_loc('R2 Final Course'))
-        hue_column = st.selectbox("Select Hue (Color):", options=aiqr2_data.columns, index=aiqr2_data.columns.get_loc('R2 Final Alloted Category'))
-        style_column = st.selectbox("Select Style (Shape):", options=aiqr2_data.columns, index=aiqr2_data.columns.get_loc('R2 Final Allotted Quota'))
+        y_axis_column = st.selectbox("Select Y-Axis:", options=aiqr2_data.columns, index=aiqr2_data.columns.get_loc('Course'))
+        hue_column = st.selectbox("Select Hue (Color):", options=aiqr2_data.columns, index=aiqr2_data.columns.get_loc('Allotted Category'))
+        style_column = st.selectbox("Select Style (Shape):", options=aiqr2_data.columns, index=aiqr2_data.columns.get_loc('Allotted Quota'))
 
         # Create scatter plot
         fig, ax = plt.subplots(figsize=(12, 8), dpi=150)
@@ -178,5 +211,56 @@ def display_cutoff_Analysis():
         fig.update_layout(xaxis_title="NEET AIR", yaxis_title=y_axis_column)
         st.plotly_chart(fig)
 
+    # Tab 5: Rank Eligibility
+    with tab5:
+        display_rank_eligibility(eligibility_engine(tuple(years), tuple(rounds)))
+
+def display_rank_eligibility(engine):
+    st.write("### Rank Eligibility")
+
+    if not engine.quotas:
+        st.warning("No allotted seats found for the selected years and rounds.")
+        return
+
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        air = st.number_input("NEET AIR:", min_value=1, value=10000, step=1)
+    with col2:
+        quota = st.selectbox("Quota:", options=engine.quotas, key="eligibility_quota")
+    with col3:
+        category = st.selectbox("Category:", options=engine.categories(quota), key="eligibility_category")
+
+    # Single AIR: binary search on the sorted closing ranks
+    eligible = engine.reachable(int(air), quota, category)
+    try:
+        eligible = join_master(eligible, normalized_master_view(master_columns()))
+    except FileNotFoundError:
+        pass
+    if 'ordered_data' in st.session_state:
+        eligible = join_order(eligible, st.session_state.ordered_data)
+
+    st.write(f"#### {len(eligible)} Reachable Seats for AIR {int(air)} ({category}, {quota})")
+    default_columns = [c for c in ['Course', 'Allotted Institute', 'Closing Rank', 'Margin', 'MAIN CODE', 'State', 'Fees', 'Order Number'] if c in eligible.columns]
+    selected_columns = st.multiselect("Select columns:", options=eligible.columns.tolist(), default=default_columns, key="eligibility_columns")
+    eligible.index = range(1, len(eligible) + 1)
+    st.dataframe(eligible[selected_columns] if selected_columns else eligible)
+
+    # Many AIRs at once: one vectorised searchsorted
+    with st.expander("Batch AIR Lookup", expanded=False):
+        air_text = st.text_area("Enter NEET AIRs (comma or newline separated):", key="eligibility_batch")
+        airs = [int(value) for value in air_text.replace(",", " ").split() if value.isdigit()]
+        if airs:
+            counts = engine.reachable_counts(airs, quota, category)
+            counts_table = pd.DataFrame({"NEET AIR": airs, "Reachable Seats": counts})
+            counts_table.index = range(1, len(counts_table) + 1)
+            st.dataframe(counts_table)
+
+            st.download_button(
+                label="Download Reachable Seats per AIR as CSV",
+                data=export_data([("Reachable Seats", engine.reachable_many(airs, quota, category))], "csv"),
+                file_name="reachable_seats.csv",
+                mime="text/csv"
+            )
+
 # Call the function to display the dashboard
 display_cutoff_Analysis()
@@ -1,27 +1,49 @@
 import streamlit as st
 import pandas as pd
-import os
+from utils.utils import master_columns
+from utils.uploads import read_upload, content_hash
+from utils.order_model import order_summary_sheets
+from utils.exports import export_buttons
+from utils.shared_frames import master_view, master_signature, shared_derived, FrameOverlay
+
+def rank_columns(master_sheet, state_data, program_data):
+    # State and program ranks for every master row (0 = unranked)
+    state_rank = master_sheet['State'].map(state_data.set_index('State')['State Rank']).fillna(0)
+
+    # First matching (Program, Program Type) row wins, case-insensitively
+    program_keys = program_data['Program'].str.upper() + "\0" + program_data['Program Type'].str.upper()
+    program_ranks = pd.Series(program_data['Program Rank'].values, index=program_keys.values)
+    program_ranks = program_ranks[~program_ranks.index.duplicated()]
+    master_keys = master_sheet['Program'].str.upper() + "\0" + master_sheet['TYPE'].str.upper()
+    program_rank = master_keys.map(program_ranks).fillna(0)
+    return state_rank.to_numpy(), program_rank.to_numpy()
 
 def display_excel_ranking():
     st.title("Order Creation with Excel")
 
-    # Path to the master file
-    MASTER_FILE = os.path.join('data', 'MASTER EXCEL.xlsx')
+    default_columns = ['MAIN CODE', 'Program', 'TYPE', 'State', 'College Name', 'Program Rank', 'State Rank', 'Order Number']
+    derived_columns = ['State Rank', 'Program Rank', 'Order Number']
 
-    if not os.path.exists(MASTER_FILE):
-        st.error(f"Master file '{MASTER_FILE}' is missing in the 'data/' folder!")
+    # Only the columns the ranking and the chosen display need, as a view of the
+    # process-wide master (versioned store if initialised, else MASTER EXCEL)
+    try:
+        all_columns = master_columns()
+        display_columns = st.session_state.get("excel_order_columns", default_columns)
+        required_columns = ['State', 'Program', 'TYPE', 'MCC College Code', 'COURSE CODE', 'Quota']
+        master_sheet = master_view(columns=dict.fromkeys(required_columns + display_columns))
+    except FileNotFoundError as e:
+        st.error(str(e))
         return
 
-    master_sheet = pd.read_excel(MASTER_FILE, sheet_name='Sheet1')
-
     # File upload section
     uploaded_file = st.file_uploader("Upload Excel File (with Two Sheets)", type=["xlsx"])
 
     if uploaded_file:
         try:
-            # Load both sheets
-            state_data = pd.read_excel(uploaded_file, sheet_name='StateRanks')
-            program_data = pd.read_excel(uploaded_file, sheet_name='ProgramRanks')
+            # Load both sheets (parsed once per upload in the background)
+            sheets = read_upload(uploaded_file, sheet_names=['StateRanks', 'ProgramRanks'])
+            state_data = sheets['StateRanks']
+            program_data = sheets['ProgramRanks']
 
             # Validate State Sheet
             if not {'State', 'State Rank'}.issubset(state_data.columns):
@@ -33,32 +55,28 @@ def display_excel_ranking():
                 st.error("Program sheet must contain 'Program', 'Program Type', and 'Program Rank' columns.")
                 return
 
-            # Map rankings
-            master_sheet['State Rank'] = master_sheet['State'].map(state_data.set_index('State')['State Rank']).fillna(0)
-            master_sheet['Program Rank'] = master_sheet.apply(
-                lambda x: program_data.loc[
-                    (program_data['Program'].str.upper() == x['Program'].upper()) &
-                    (program_data['Program Type'].str.upper() == x['TYPE'].upper()),
-                    'Program Rank'
-                ].values[0] if ((program_data['Program'].str.upper() == x['Program'].upper()) &
-                                (program_data['Program Type'].str.upper() == x['TYPE'].upper())).any() else 0,
-                axis=1
+            # Map rankings; computed once per (master, upload) and shared across sessions
+            state_rank, program_rank = shared_derived(
+                ("excel_ranks", master_signature(), content_hash(uploaded_file.getvalue())),
+                lambda: rank_columns(master_sheet, state_data, program_data)
             )
+            ranked = FrameOverlay(master_sheet).with_columns(**{'State Rank': state_rank, 'Program Rank': program_rank})
 
             # Generate ordered table
-            ordered_data = master_sheet.query("`State Rank` > 0 and `Program Rank` > 0").sort_values(
+            ordered_data = ranked.to_frame().query("`State Rank` > 0 and `Program Rank` > 0").sort_values(
                 by=['Program Rank', 'State Rank']
             ).reset_index(drop=True)
             ordered_data['Order Number'] = range(1, len(ordered_data) + 1)
+            st.session_state.ordered_data = ordered_data  # reused by Rank Eligibility
 
             # Collapsible section to select columns to display
             with st.expander("Select Columns to Display", expanded=True):
                 st.write("### Choose the columns you want to include in the ordered table:")
-                default_columns = ['MAIN CODE', 'Program', 'TYPE', 'State', 'College Name', 'Program Rank', 'State Rank', 'Order Number']
                 selected_columns = st.multiselect(
                     "Select columns:",
-                    list(master_sheet.columns) + ['State Rank', 'Program Rank', 'Order Number'],
-                    default=default_columns
+                    list(dict.fromkeys(all_columns + derived_columns)),
+                    default=default_columns,
+                    key="excel_order_columns"
                 )
 
             # Display ordered table
@@ -67,6 +85,7 @@ def display_excel_ranking():
             else:
                 st.write("### Ordered Table from Uploaded Excel")
                 st.dataframe(ordered_data[selected_columns])
+                export_buttons("Ordered Table", order_summary_sheets(ordered_data, selected_columns), "ordered_table")
         except Exception as e:
             st.error(f"An error occurred while processing the uploaded file: {e}")
     else:
@@ -1,34 +1,68 @@
 import streamlit as st
 import pandas as pd
-import seaborn as sns
-import matplotlib.pyplot as plt
+from utils.uploads import read_upload, content_hash
+from utils.shared_frames import shared_derived, allotments_generation
+from utils.charts import render_chart, MAX_ESTIMATOR_ROWS
+from utils.exports import export_data
+from utils.allotment_store import AllotmentStore
+from utils.query_engine import frame_source, allotment_source, SQL_ENGINE, THREADS, MEMORY_LIMIT, PREVIEW_ROWS
+
+
+@st.cache_resource(max_entries=8, show_spinner=False)
+def upload_source(key, _data):
+    # One query source per distinct upload, shared by every session
+    return frame_source(_data, key)
+
+
+@st.cache_resource(max_entries=2, show_spinner=False)
+def store_source(generation):
+    # Parquet allotment history (all years and rounds), queried in place
+    return allotment_source(("allotments", generation))
 
 
 def display_general_analysis():
     st.title("General Data Analysis Dashboard")
 
-    # Step 1: File Upload
-    uploaded_file = st.file_uploader("Upload your file (CSV or Excel):", type=['csv', 'xlsx'])
+    data_source = st.radio("Data Source:", options=["Uploaded File", "Allotment History"], horizontal=True)
 
-    if not uploaded_file:
-        st.info("Please upload a file to get started.")
-        return
+    if data_source == "Uploaded File":
+        # Step 1: File Upload
+        uploaded_file = st.file_uploader("Upload your file (CSV or Excel):", type=['csv', 'xlsx'])
 
-    # Step 2: Load the File
-    try:
-        if uploaded_file.name.endswith('.csv'):
-            data = pd.read_csv(uploaded_file)
-        else:
-            data = pd.read_excel(uploaded_file)
+        if not uploaded_file:
+            st.info("Please upload a file to get started.")
+            return
+
+        # Step 2: Load the File
+        try:
+            # Parsed once per upload in the background; reruns reuse the frame
+            data = read_upload(uploaded_file)[0]
+            source = upload_source(content_hash(uploaded_file.getvalue()), data)
 
-        st.success("File uploaded successfully!")
-    except Exception as e:
-        st.error(f"Error reading file: {e}")
-        return
+            st.success("File uploaded successfully!")
+        except Exception as e:
+            st.error(f"Error reading file: {e}")
+            return
 
-    # Display the dataset
-    st.write("### Uploaded Dataset")
-    st.dataframe(data)
+        # Display the dataset
+        st.write("### Uploaded Dataset")
+        st.dataframe(data)
+    else:
+        try:
+            AllotmentStore().ensure_seeded()
+            source = store_source(allotments_generation())
+        except Exception as e:
+            st.error(f"Error loading the allotment history: {e}")
+            return
+
+        st.write("### Allotment History")
+        st.caption(f"{source.row_count():,} rows; showing the first {PREVIEW_ROWS:,}.")
+        st.dataframe(source.preview(PREVIEW_ROWS))
+
+    if SQL_ENGINE:
+        st.caption(f"Query engine: DuckDB ({THREADS} threads, {MEMORY_LIMIT} before spilling to disk)")
+    else:
+        st.caption("Query engine: pandas (install duckdb to query data larger than memory)")
 
     # Tabs for Analysis, Pivot Table, Frequency Table, and Statistical Table
     tab1, tab2, tab3, tab4 = st.tabs(["Graph Analysis", "Pivot Table", "Grouped Frequency Table", "Statistical Table"])
@@ -36,9 +70,8 @@ def display_general_analysis():
     # Tab 1: Graph Analysis
     with tab1:
         st.write("### Select Graph Type and Plot")
-        numeric_columns = data.select_dtypes(include=['number']).columns.tolist()
-        categorical_columns = data.select_dtypes(include=['object', 'category']).columns.tolist()
-        all_columns = data.columns.tolist()
+        numeric_columns = source.numeric_columns
+        all_columns = source.columns
 
         if not numeric_columns:
             st.warning("No numeric columns detected. Plotting might not work.")
@@ -47,80 +80,59 @@ def display_general_analysis():
         # User Selection for Filters
         with st.expander("Select Filters"):
             filters = {}
-            for col in all_columns:
-                unique_values = data[col].unique()
-                if len(unique_values) <= 50:
-                    selected_values = st.multiselect(f"Filter {col}:", options=unique_values, default=unique_values)
-                    if selected_values and len(selected_values) < len(unique_values):
-                        filters[col] = selected_values
-
-        # Apply Filters
-        filtered_data = data.copy()
-        for col, selected_values in filters.items():
-            filtered_data = filtered_data[filtered_data[col].isin(selected_values)]
+            for col, unique_values in source.filter_options().items():
+                selected_values = st.multiselect(f"Filter {col}:", options=unique_values, default=unique_values)
+                if selected_values and len(selected_values) < len(unique_values):
+                    filters[col] = selected_values
 
         # Select Graph Type
         graph_type = st.selectbox("Select Graph Type:", options=["Scatter Plot", "Line Plot", "Bar Chart", "Histogram"])
         x_axis = st.selectbox("Select X-Axis:", options=all_columns)
         y_axis = st.selectbox("Select Y-Axis:", options=numeric_columns if numeric_columns else [None], index=0)
 
-        # Generate Selected Graph
+        hue = style = None
         if graph_type == "Scatter Plot":
             hue = st.selectbox("Select Hue (Color):", options=all_columns + [None], index=len(all_columns))
             style = st.selectbox("Select Style (Shape):", options=all_columns + [None], index=len(all_columns))
 
-            fig, ax = plt.subplots(figsize=(12, 8))
-            sns.scatterplot(
-                data=filtered_data,
-                x=x_axis,
-                y=y_axis,
-                hue=hue if hue else None,
-                style=style if style else None,
-                ax=ax,
-                s=50  # Marker size
-            )
-            st.pyplot(fig)
-
-        elif graph_type == "Line Plot":
-            fig, ax = plt.subplots(figsize=(12, 8))
-            sns.lineplot(data=filtered_data, x=x_axis, y=y_axis, ax=ax)
-            st.pyplot(fig)
-
-        elif graph_type == "Bar Chart":
-            fig, ax = plt.subplots(figsize=(12, 8))
-            sns.barplot(data=filtered_data, x=x_axis, y=y_axis, ax=ax)
-            st.pyplot(fig)
-
-        elif graph_type == "Histogram":
-            fig, ax = plt.subplots(figsize=(12, 8))
-            sns.histplot(data=filtered_data, x=x_axis, bins=20, kde=True, ax=ax)
-            st.pyplot(fig)
+        # Generate Selected Graph (rendered once per dataset, filters and settings;
+        # only the plotted columns of the filtered rows are fetched)
+        if graph_type == "Histogram":
+            y_axis = None
+        plotted = [c for c in [x_axis, y_axis, hue, style] if c]
+        chart, sampled = render_chart(
+            source.key, source.filter_key(filters), lambda: source.frame(plotted, filters),
+            graph_type, x_axis, y_axis, hue, style
+        )
+        st.image(chart)
+        if sampled:
+            estimator = "KDE" if graph_type == "Histogram" else "Mean and 95% CI"
+            st.caption(f"{estimator} estimated from a random sample of {MAX_ESTIMATOR_ROWS:,} of {source.row_count(filters):,} rows.")
 
     # Tab 2: Pivot Table
     with tab2:
         st.write("### Create a Pivot Table")
 
-        rows = st.multiselect("Select Rows:", options=data.columns, default=[data.columns[0]])
-        columns = st.multiselect("Select Columns:", options=data.columns, default=[])
+        rows = st.multiselect("Select Rows:", options=all_columns, default=[all_columns[0]])
+        columns = st.multiselect("Select Columns:", options=all_columns, default=[])
         values = st.multiselect("Select Values (Numeric):", options=numeric_columns, default=numeric_columns[:1])
         aggfunc = st.selectbox("Select Aggregation Function:", options=["sum", "mean", "max", "min", "count"], index=0)
 
-        if rows and values:
-            pivot_table = pd.pivot_table(
-                data,
-                values=values,
-                index=rows,
-                columns=columns if columns else None,
-                aggfunc=aggfunc,
-                fill_value=0
+        if set(values) & set(rows + columns):
+            st.warning("A column cannot be used both as a value and as a row or column.")
+        elif rows and values:
+            # Aggregated by the query engine; shared across sessions
+            pivot_table = shared_derived(
+                ("pivot", source.key, tuple(rows), tuple(columns), tuple(values), aggfunc),
+                lambda: source.pivot(rows, columns, values, aggfunc),
+                cache="pivots"
             )
             st.write("### Generated Pivot Table")
             st.dataframe(pivot_table)
 
-            pivot_csv = pivot_table.to_csv()
             st.download_button(
                 label="Download Pivot Table as CSV",
-                data=pivot_csv,
+                data=export_data([("Pivot Table", pivot_table)], "csv", index=True),
                 file_name="pivot_table.csv",
                 mime="text/csv"
             )
@@ -129,29 +141,24 @@ def display_general_analysis():
     with tab3:
         st.write("### Create a Grouped Frequency Table")
 
-        group_columns = st.multiselect("Select Rows for Grouping:", options=data.columns, default=[])
+        group_columns = st.multiselect("Select Rows for Grouping:", options=all_columns, default=[])
 
         if group_columns:
-            binned_data = data.copy()
             bin_size = st.slider("Select Bin Size for Numeric Columns (if any):", min_value=1, max_value=50, value=10)
-            for col in group_columns:
-                if pd.api.types.is_numeric_dtype(data[col]):
-                    binned_data[col] = pd.cut(
-                        data[col],
-                        bins=range(int(data[col].min()), int(data[col].max()) + bin_size, bin_size),
-                        right=False
-                    )
 
-            grouped_data = binned_data.groupby(group_columns).size().reset_index(name='Count')
-            grouped_data['Percentage'] = (grouped_data['Count'] / grouped_data['Count'].sum() * 100).round(2).astype(str) + '%'
+            # Numeric columns are binned and counted by the query engine
+            grouped_data = shared_derived(
+                ("frequency", source.key, tuple(group_columns), bin_size),
+                lambda: source.frequency(group_columns, bin_size),
+                cache="pivots"
+            )
 
             st.write("### Grouped Frequency Table")
             st.dataframe(grouped_data)
 
-            frequency_csv = grouped_data.to_csv(index=False)
             st.download_button(
                 label="Download Frequency Table as CSV",
-                data=frequency_csv,
+                data=export_data([("Frequency Table", grouped_data)], "csv"),
                 file_name="grouped_frequency_table.csv",
                 mime="text/csv"
             )
@@ -161,10 +168,10 @@ def display_general_analysis():
         st.write("### Generate a Statistical Table")
 
         # Only allow numeric columns for statistical analysis
-        numeric_columns = data.select_dtypes(include=['number']).columns.tolist()
         columns = st.multiselect("Select Numeric Columns for Statistical Analysis:", options=numeric_columns)
 
         if columns:
+            data = source.frame(columns)
             stats_table = pd.DataFrame({
                 "Metric": columns,
                 "Mean": data[columns].mean().values,
@@ -175,10 +182,9 @@ def display_general_analysis():
             st.write("### Statistical Table")
             st.table(stats_table)
 
-            csv = stats_table.to_csv(index=False)
             st.download_button(
                 label="Download Statistical Table as CSV",
-                data=csv,
+                data=export_data([("Statistical Table", stats_table)], "csv"),
                 file_name="statistical_table.csv",
                 mime="text/csv"
             )
@@ -1,44 +1,112 @@
 import streamlit as st
 import pandas as pd
-import os
+from utils.master_store import get_store
+from utils.excel_reader import recent_parse_times
+from utils.shared_frames import master_view
 
 def display_master_data():
     st.title("Master Data Overview")
 
-    MASTER_FILE = "data/MASTER EXCEL.xlsx"
-
-    @st.cache_data
-    def load_master_file():
-        if os.path.exists(MASTER_FILE):
-            data = pd.read_excel(MASTER_FILE, sheet_name='Sheet1')
-            return data
-        else:
-            st.error("Master file not found.")
-            return None
-
-    master_sheet = load_master_file()
-
-    if master_sheet is not None:
-        # Adjust the index to start from 1
-        master_sheet.index = master_sheet.index + 1
-
-        # Allow the user to select columns to display
-        all_columns = master_sheet.columns.tolist()
-        selected_columns = st.multiselect(
-            "Select columns to display:",
-            options=all_columns,
-            default=all_columns  # By default, show all columns
-        )
-
-        if selected_columns:
-            filtered_data = master_sheet[selected_columns]
-
-            # Display the filtered table
-            numeric_columns = filtered_data.select_dtypes(include=['int64', 'float64']).columns
-            st.write("### Filtered Master Sheet")
-            st.dataframe(filtered_data.style.format({col: "{:.0f}" for col in numeric_columns}))
-        else:
-            st.warning("Please select at least one column to display.")
+    store = get_store()
+
+    # View of the shared master (store head, else MASTER EXCEL); the index change
+    # below only affects this view
+    try:
+        master_sheet = master_view()
+    except FileNotFoundError:
+        st.error("Master file not found.")
+        master_sheet = None
+
+    tab1, tab2 = st.tabs(["Master Sheet", "Versions"])
+
+    with tab1:
+        if master_sheet is not None:
+            if store.head:
+                st.caption(f"Master store version {store.head}")
+
+            # Adjust the index to start from 1
+            master_sheet.index = master_sheet.index + 1
+
+            # Allow the user to select columns to display
+            all_columns = master_sheet.columns.tolist()
+            selected_columns = st.multiselect(
+                "Select columns to display:",
+                options=all_columns,
+                default=all_columns  # By default, show all columns
+            )
+
+            if selected_columns:
+                filtered_data = master_sheet[selected_columns]
+
+                # Display the filtered table
+                numeric_columns = filtered_data.select_dtypes(include=['int64', 'float64']).columns
+                st.write("### Filtered Master Sheet")
+                st.dataframe(filtered_data.style.format({col: "{:.0f}" for col in numeric_columns}))
+            else:
+                st.warning("Please select at least one column to display.")
+
+        with st.expander("Excel Parse Timings", expanded=False):
+            st.dataframe(recent_parse_times())
+
+    with tab2:
+        display_master_versions(store, master_sheet)
+
+def display_master_versions(store, master_sheet):
+    st.write("### Master Data Versions")
+
+    if not store.exists():
+        st.info("The versioned master store has not been initialised yet.")
+        if master_sheet is not None and st.button("Initialise Store from MASTER EXCEL.xlsx"):
+            store.initialize(master_sheet)
+            st.success("Master store initialised as version 1.")
+            st.rerun()
+        return
+
+    # Version history
+    history = store.history()
+    history.index = range(1, len(history) + 1)
+    st.dataframe(history)
+
+    # Delta upload
+    with st.expander("Apply Delta Workbook", expanded=False):
+        st.write("Rows are keyed by **MAIN CODE**; the **ACTION** column must be ADD, UPDATE or DELETE. "
+                 "Empty cells in UPDATE rows keep their current value.")
+        delta_file = st.file_uploader("Upload Delta (Excel)", type=["xlsx"], key="master_delta")
+        if delta_file and st.button("Apply Delta"):
+            try:
+                entry = store.apply_delta(delta_file, source=delta_file.name)
+                if entry is None:
+                    st.info("The delta changes nothing; no new version was created.")
+                else:
+                    st.success(
+                        f"Version {entry['version']} created: {entry['added']} added, "
+                        f"{entry['updated']} updated, {entry['deleted']} deleted."
+                    )
+                    st.rerun()
+            except ValueError as e:
+                st.error(f"Delta rejected: {e}")
+
+    # Diff between versions
+    versions = history['version'].tolist()
+    if len(versions) > 1:
+        st.write("### Compare Versions")
+        col1, col2 = st.columns(2)
+        with col1:
+            from_version = st.selectbox("From Version:", options=versions, index=len(versions) - 2)
+        with col2:
+            to_version = st.selectbox("To Version:", options=versions, index=len(versions) - 1)
+
+        if from_version != to_version:
+            diff = store.diff(from_version, to_version)
+            for label, key in [("Added Rows", "added"), ("Deleted Rows", "deleted"), ("Changed Values", "changed")]:
+                table = diff[key]
+                with st.expander(f"{label} ({len(table)})"):
+                    if table.empty:
+                        st.write(f"No {label.lower()}.")
+                    else:
+                        table = table.reset_index(drop=True)
+                        table.index = range(1, len(table) + 1)
+                        st.dataframe(table)
 
 # Call the function to display the data
 display_master_data()
@@ -1,38 +1,120 @@
 import streamlit as st
 import pandas as pd
-import os
+from utils.utils import master_columns
+from utils.shared_frames import normalized_master_view
+from utils.order_model import OrderModel, order_summary_sheets
+from utils.exports import export_buttons
+from utils.ranking_sessions import SessionStore, profiles_from_zip, bulk_orders
+
+def get_order_model(master_sheet):
+    # Rebuilt only when the ranked rows themselves change (e.g. a new master version)
+    signature = int(pd.util.hash_pandas_object(master_sheet[['State', 'Program', 'TYPE']], index=False).sum())
+    if st.session_state.get('order_model_signature') != signature:
+        st.session_state.order_model = OrderModel(master_sheet)
+        st.session_state.order_model_signature = signature
+    return st.session_state.order_model
+
+def _widget_ranks(ranking, keys):
+    # Ranks a selectbox can show: within 1..len(keys) and each used once, else 0
+    ranks, used = {}, set()
+    for key in keys:
+        rank = int(ranking.get(key, 0))
+        if not 0 < rank <= len(keys) or rank in used:
+            rank = 0
+        used.add(rank)
+        ranks[key] = rank
+    return ranks
+
+def save_ranking_session(store, states, programs):
+    # Callback: reads the ranks straight from the selectbox state
+    name = st.session_state.get("session_name", "").strip()
+    state_ranking = {state: st.session_state.get(f"state_{state}", 0) for state in states}
+    program_ranking = {f"{program}_{program_type}": st.session_state.get(f"program_{program}_{program_type}", 0)
+                       for program, program_type in programs}
+    try:
+        store.save(name, state_ranking, program_ranking)
+        st.session_state.session_message = ("success", f"Saved ranking session '{name}'.")
+    except (ValueError, OSError) as e:
+        st.session_state.session_message = ("error", f"Could not save session: {e}")
+
+def load_ranking_session(store, states, programs):
+    # Callback: runs before the selectboxes are created, so they pick up the loaded ranks
+    name = st.session_state.get("session_selected")
+    try:
+        _, state_ranking, program_ranking = store.load(name)
+    except (ValueError, OSError) as e:
+        st.session_state.session_message = ("error", f"Could not load session: {e}")
+        return
+    for state, rank in _widget_ranks(state_ranking, list(states)).items():
+        st.session_state[f"state_{state}"] = rank
+    program_keys = [f"{program}_{program_type}" for program, program_type in programs]
+    ranks = _widget_ranks(program_ranking, program_keys)
+    for (program, program_type), key in zip(programs, program_keys):
+        st.session_state[f"program_{program}_{program_type}"] = ranks[key]
+    st.session_state.session_message = ("success", f"Loaded ranking session '{name}'.")
+
+def delete_ranking_session(store):
+    # Sessions are shared by every user of this server, so deleting needs the confirm box
+    name = st.session_state.get("session_selected")
+    st.session_state.session_confirm_delete = False
+    store.delete(name)
+    st.session_state.session_message = ("success", f"Deleted ranking session '{name}'.")
 
 def display_order_creation():
     st.title("Order Creation Dashboard")
 
-    # Path to the master file
-    MASTER_FILE = os.path.join('data', 'MASTER EXCEL.xlsx')
-
-    # Load MASTER EXCEL file
-    if not os.path.exists(MASTER_FILE):
-        st.error(f"Master file '{MASTER_FILE}' is missing in the 'data/' folder!")
+    default_columns = ['MAIN CODE', 'Program', 'TYPE', 'State', 'College Name', 'Program Rank', 'State Rank', 'Order Number']
+    derived_columns = ['State Rank', 'Program Rank', 'Order Number']
+
+    # Only the columns the ranking and the chosen display need, as a view of the
+    # process-wide master (versioned store if initialised, else MASTER EXCEL)
+    try:
+        all_columns = list(dict.fromkeys(master_columns() + ['MAIN CODE']))
+        display_columns = st.session_state.get("order_columns", default_columns)
+        master_sheet = normalized_master_view(
+            columns=['College Name', 'Quota'] + [c for c in display_columns if c not in derived_columns]
+        )
+    except FileNotFoundError as e:
+        st.error(str(e))
         return
 
-    master_sheet = pd.read_excel(MASTER_FILE, sheet_name='Sheet1')
-
-    # Normalize columns
-    master_sheet['State'] = master_sheet['State'].str.strip().str.upper()
-    master_sheet['Program'] = master_sheet['Program'].str.strip().str.upper()
-    master_sheet['TYPE'] = master_sheet['TYPE'].astype(str).str.strip().str.upper()
-
-    # Create MAIN CODE column
-    if {'MCC College Code', 'COURSE CODE'}.issubset(master_sheet.columns):
-        master_sheet['MAIN CODE'] = master_sheet['MCC College Code'].astype(str) + "_" + master_sheet['COURSE CODE'].astype(str)
-
     # Ensure necessary columns exist
     if {'State', 'Program', 'College Name', 'TYPE'}.issubset(master_sheet.columns):
         unique_states = master_sheet['State'].unique()
+        program_pairs = list(master_sheet[['Program', 'TYPE']].drop_duplicates().itertuples(index=False, name=None))
+
+        # Saved ranking sessions (compact .npz files under data/store/sessions)
+        store = SessionStore()
+        with st.expander("Saved Ranking Sessions"):
+            save_col, load_col = st.columns(2)
+            with save_col:
+                st.text_input("Session name:", key="session_name")
+                st.button("Save Current Rankings", on_click=save_ranking_session,
+                          args=(store, unique_states, program_pairs))
+            with load_col:
+                session_names = store.names()
+                st.selectbox("Saved sessions:", session_names, key="session_selected")
+                load_button, delete_button = st.columns(2)
+                with load_button:
+                    st.button("Load Session", on_click=load_ranking_session,
+                              args=(store, unique_states, program_pairs), disabled=not session_names)
+                with delete_button:
+                    confirm_delete = st.checkbox("Confirm delete", key="session_confirm_delete", disabled=not session_names)
+                    st.button("Delete Session", on_click=delete_ranking_session,
+                              args=(store,), disabled=not (session_names and confirm_delete))
+
+            message = st.session_state.pop("session_message", None)
+            if message:
+                getattr(st, message[0])(message[1])
+            if session_names:
+                st.dataframe(store.list(), hide_index=True)
 
         # Tabs for Ranking and Orders
-        tab1, tab2, tab3 = st.tabs([
+        tab1, tab2, tab3, tab4 = st.tabs([
             "Ranking States",
             "Ranking Programs by Type",
-            "Generate Order Table"
+            "Generate Order Table",
+            "Bulk Orders"
         ])
 
         # Ranking States
@@ -107,31 +189,50 @@ def display_order_creation():
             # Collapsible section to select columns to display
             with st.expander("Select Columns to Display", expanded=True):
                 st.write("### Choose the columns you want to include in the ordered table:")
-                default_columns = ['MAIN CODE', 'Program', 'TYPE', 'State', 'College Name', 'Program Rank', 'State Rank', 'Order Number']
                 selected_columns = st.multiselect(
                     "Select columns:",
-                    list(master_sheet.columns) + ['State Rank', 'Program Rank', 'Order Number'],  # Include derived columns
-                    default=default_columns
+                    all_columns + derived_columns,  # Include derived columns
+                    default=default_columns,
+                    key="order_columns"
                 )
 
             # Generate Order Table button
             if st.button("Generate Order Table"):
-                # Apply rankings to the master sheet
-                master_sheet['State Rank'] = master_sheet['State'].map(state_ranking).fillna(0)
-                master_sheet['Program Rank'] = master_sheet.apply(
-                    lambda x: program_ranking.get(f"{x['Program']}_{x['TYPE']}", 0), axis=1
-                )
-
-                # Filter and sort data
-                ordered_data = master_sheet.query("`State Rank` > 0 and `Program Rank` > 0").sort_values(
-                    by=['Program Rank', 'State Rank']
-                ).reset_index(drop=True)
-                ordered_data['Order Number'] = range(1, len(ordered_data) + 1)
+                # Rankings are applied incrementally to the order kept in session state
+                order_model = get_order_model(master_sheet)
+                order_model.sync(state_ranking, program_ranking)
+                ordered_data = order_model.ordered_frame(master_sheet)
+                st.session_state.ordered_data = ordered_data  # reused by Rank Eligibility
 
                 # Display the selected columns
                 if selected_columns:
                     st.write("### Ordered Table")
                     ordered_data.index = range(1, len(ordered_data) + 1)  # Reset index to start from 1
                     st.dataframe(ordered_data[selected_columns])
+                    export_buttons("Ordered Table", order_summary_sheets(ordered_data, selected_columns), "ordered_table")
                 else:
                     st.warning("Please select at least one column to display the table.")
+
+        # Regenerate orders for many saved profiles at once
+        with tab4:
+            st.subheader("Generate Orders for Saved Profiles")
+            selected_sessions = st.multiselect("Saved sessions:", store.names(), key="bulk_sessions")
+            profile_zip = st.file_uploader("Or upload a zip of session files (.npz)", type="zip", key="bulk_profiles")
+
+            if st.button("Generate Bulk Orders"):
+                try:
+                    profiles = store.load_many(selected_sessions)
+                    if profile_zip is not None:
+                        profiles.update(profiles_from_zip(profile_zip))
+                except (ValueError, OSError) as e:
+                    st.error(f"Could not load profiles: {e}")
+                    profiles = {}
+
+                if profiles:
+                    bulk_columns = [c for c in selected_columns if c not in derived_columns]
+                    summary, orders = bulk_orders(get_order_model(master_sheet), master_sheet, profiles, bulk_columns)
+                    st.write("### Profiles")
+                    st.dataframe(summary, hide_index=True)
+                    export_buttons("Bulk Orders", [("Summary", summary), ("Orders", orders)], "bulk_orders")
+                else:
+                    st.warning("Select saved sessions or upload profiles to generate orders.")
@@ -0,0 +1,30 @@
+import os
+import threading
+import time
+
+from utils import allotment_store
+from utils.allotment_store import AllotmentStore
+
+
+def test_concurrent_seeding_ingests_once(tmp_path, monkeypatch):
+    workbook = tmp_path / "round1.xlsx"
+    workbook.write_bytes(b"")
+    monkeypatch.setattr(allotment_store, "DEFAULT_WORKBOOKS", [(str(workbook), 2024, 1)])
+
+    calls = []
+
+    def slow_ingest(self, path, year, round_no):
+        # Slow enough that an unlocked second caller would still see an empty store
+        calls.append(path)
+        time.sleep(0.2)
+        os.makedirs(self._partition_path(year, round_no))
+
+    monkeypatch.setattr(AllotmentStore, "ingest", slow_ingest)
+    store = AllotmentStore(str(tmp_path / "store"))
+    threads = [threading.Thread(target=store.ensure_seeded) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert calls == [str(workbook)]
@@ -0,0 +1,37 @@
+import io
+
+import pandas as pd
+
+from utils.batch_comparison import COUNT_COLUMNS, batch_compare
+
+
+def order_workbook(rows):
+    frame = pd.DataFrame(rows, columns=[
+        "MCC College Code", "College Name", "COURSE CODE", "Program", "Quota", "TYPE", "Student Order"
+    ])
+    buffer = io.BytesIO()
+    frame.to_excel(buffer, sheet_name="Sheet1", index=False)
+    return buffer.getvalue()
+
+
+def master():
+    return pd.DataFrame({
+        "MCC College Code": ["1", "2"],
+        "COURSE CODE": ["10", "20"],
+        "Quota": ["AI", "AI"],
+    })
+
+
+def test_failed_files_keep_integer_counts():
+    files = [
+        ("good.xlsx", order_workbook([["1", "College", "10", "MD", "AI", "GOVT", 1], ["3", "Other", "30", "MS", "AI", "GOVT", 2]])),
+        ("broken.xlsx", b"not a workbook"),
+    ]
+    for max_workers in (1, 2):
+        summary, codes_by_file = batch_compare(files, master(), max_workers=max_workers)
+
+        assert all(str(summary[column].dtype) == "Int64" for column in COUNT_COLUMNS)
+        good = summary.set_index("File").loc["good.xlsx"]
+        assert (good["Options"], good["Matched"], good["Unmatched"]) == (2, 1, 1)
+        assert summary.set_index("File").loc["broken.xlsx", "Options"] is pd.NA
+        assert list(codes_by_file) == ["good.xlsx"]
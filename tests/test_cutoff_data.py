@@ -0,0 +1,12 @@
+import numpy as np
+import pandas as pd
+
+from utils.cutoff_data import value_options
+
+
+def test_value_options_follow_the_mask():
+    value_set = pd.factorize(pd.Series(["GEN", "OBC", "GEN", "SC", "OBC"]))
+
+    assert value_options(value_set) == ["GEN", "OBC", "SC"]
+    assert value_options(value_set, np.array([False, True, False, True, True])) == ["OBC", "SC"]
+    assert value_options(value_set, np.zeros(5, dtype=bool)) == []
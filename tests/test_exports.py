@@ -0,0 +1,44 @@
+import gzip
+import io
+import zipfile
+
+import numpy as np
+import pandas as pd
+
+from utils.exports import build_bundle
+
+
+def mixed_frame():
+    # Like SERVICE YEARS / Fees OLD in the master: numbers and text in one column
+    return pd.DataFrame({
+        'MAIN CODE': ["A", "B", "C"],
+        'SERVICE YEARS': pd.Series([2, "0*", np.nan], dtype=object),
+        'Fees OLD': pd.Series([150000.0, "NA AS PER MCC", 90000], dtype=object),
+        'Order Number': [1, 2, 3],
+    })
+
+
+def test_parquet_bundle_round_trips_mixed_columns():
+    frame = mixed_frame()
+    bundle = build_bundle([("Ordered Table", frame), ("Summary", frame.head(1))], "parquet")
+
+    with zipfile.ZipFile(io.BytesIO(bundle)) as archive:
+        assert archive.namelist() == ["Ordered Table.parquet", "Summary.parquet"]
+        restored = pd.read_parquet(io.BytesIO(archive.read("Ordered Table.parquet")))
+
+    assert restored.columns.tolist() == frame.columns.tolist()
+    assert restored['SERVICE YEARS'].tolist()[:2] == ["2", "0*"]
+    assert pd.isna(restored['SERVICE YEARS'].iloc[2])
+    assert restored['Fees OLD'].tolist() == ["150000.0", "NA AS PER MCC", "90000"]
+    assert restored['Order Number'].tolist() == [1, 2, 3]
+
+
+def test_csv_and_excel_bundles_keep_mixed_values():
+    frame = mixed_frame()
+
+    with zipfile.ZipFile(io.BytesIO(build_bundle([("Ordered Table", frame)], "csv.gz"))) as archive:
+        restored = pd.read_csv(io.BytesIO(gzip.decompress(archive.read("Ordered Table.csv.gz"))), dtype=str)
+    assert restored['SERVICE YEARS'].tolist()[:2] == ["2", "0*"]
+
+    restored = pd.read_excel(io.BytesIO(build_bundle([("Ordered Table", frame)], "xlsx")))
+    assert restored['Fees OLD'].tolist() == [150000, "NA AS PER MCC", 90000]
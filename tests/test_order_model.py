@@ -0,0 +1,82 @@
+import numpy as np
+import pandas as pd
+
+from utils.order_model import OrderModel
+
+
+def make_master(n_rows=400, seed=0):
+    rng = np.random.default_rng(seed)
+    states = np.array([f"STATE {i}" for i in range(12)], dtype=object)
+    master = pd.DataFrame({
+        'State': states[rng.integers(0, len(states), n_rows)],
+        'Program': [f"PROGRAM {i}" for i in rng.integers(0, 15, n_rows)],
+        'TYPE': rng.choice(['GOVT', 'PVT'], n_rows),
+        'MAIN CODE': [f"CODE {i}" for i in range(n_rows)],
+    })
+    # Rows without a State (e.g. added through a master delta) are never ranked
+    master.loc[rng.choice(n_rows, 20, replace=False), 'State'] = np.nan
+    return master
+
+
+def full_recompute(master, state_ranking, program_ranking):
+    # The page's original computation; a stable sort so ties keep master row order
+    ranked = master.assign(**{
+        'State Rank': master['State'].map(state_ranking).fillna(0),
+        'Program Rank': [program_ranking.get(f"{p}_{t}", 0) for p, t in zip(master['Program'], master['TYPE'])],
+    })
+    ranked = ranked.query("`State Rank` > 0 and `Program Rank` > 0")
+    return ranked.sort_values(by=['Program Rank', 'State Rank'], kind='stable')['MAIN CODE'].tolist()
+
+
+def random_ranking(rng, keys):
+    # A permutation of 1..len(keys) with some keys left unranked (0)
+    ranks = rng.permutation(len(keys)) + 1
+    return {key: int(rank) for key, rank in zip(keys, ranks) if rng.random() < 0.8}
+
+
+def test_incremental_updates_match_full_recompute():
+    rng = np.random.default_rng(1)
+    master = make_master()
+    model = OrderModel(master)
+    states = [s for s in model.states]
+    programs = [p for p in model.programs]
+    state_ranking = random_ranking(rng, states)
+    program_ranking = random_ranking(rng, programs)
+    model.sync(state_ranking, program_ranking)
+
+    for _ in range(300):
+        # Move, add or clear one rank at a time, keeping ranks within the selectbox bounds
+        if rng.random() < 0.5:
+            state_ranking[states[rng.integers(len(states))]] = int(rng.integers(0, len(states) + 1))
+        else:
+            program_ranking[programs[rng.integers(len(programs))]] = int(rng.integers(0, len(programs) + 1))
+        model.sync(state_ranking, program_ranking)
+
+        ordered = model.ordered_frame(master)
+        assert ordered['MAIN CODE'].tolist() == full_recompute(master, state_ranking, program_ranking)
+        assert ordered['Order Number'].tolist() == list(range(1, len(ordered) + 1))
+
+
+def test_missing_state_is_never_ranked():
+    master = make_master()
+    model = OrderModel(master)
+    # Rank every state and program, so code -1 would hit the last state's rank if misread
+    model.sync(
+        {state: i + 1 for i, state in enumerate(model.states)},
+        {program: i + 1 for i, program in enumerate(model.programs)},
+    )
+    ordered = model.ordered_frame(master)
+    assert ordered['State'].notna().all()
+    assert (model.order_numbers[master['State'].isna().to_numpy()] == 0).all()
+
+
+def test_ordered_rows_matches_synced_order():
+    rng = np.random.default_rng(2)
+    master = make_master()
+    model = OrderModel(master)
+    state_ranking = random_ranking(rng, list(model.states))
+    program_ranking = random_ranking(rng, list(model.programs))
+    model.sync(state_ranking, program_ranking)
+
+    rows = model.ordered_rows(*model.rank_arrays(state_ranking, program_ranking))
+    assert np.array_equal(rows, model.order % model.n_rows)
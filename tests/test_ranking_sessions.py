@@ -0,0 +1,84 @@
+import io
+import zipfile
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils import ranking_sessions
+from utils.order_model import OrderModel
+from utils.ranking_sessions import SessionStore, bulk_orders, decode_session, encode_session, profiles_from_zip
+
+
+def test_names_that_sanitise_alike_keep_separate_files(tmp_path):
+    store = SessionStore(str(tmp_path))
+    store.save("a b", {"DELHI": 1}, {})
+    store.save("a_b", {"GOA": 1}, {})
+
+    assert store.names() == ["a b", "a_b"]
+    assert store.load("a b")[1] == {"DELHI": 1}
+    assert store.load("a_b")[1] == {"GOA": 1}
+
+
+def test_list_reflects_resaved_and_deleted_sessions(tmp_path):
+    store = SessionStore(str(tmp_path))
+    store.save("student", {"DELHI": 1}, {"MD_GOVT": 1})
+    assert store.list()[["States Ranked", "Programs Ranked"]].values.tolist() == [[1, 1]]
+
+    store.save("student", {"DELHI": 1, "GOA": 2}, {"MD_GOVT": 1})
+    assert store.list()["States Ranked"].tolist() == [2]
+
+    store.delete("student")
+    assert store.list().empty
+
+
+def test_bulk_orders_skip_rows_without_state():
+    master = pd.DataFrame({
+        'State': ["DELHI", np.nan, "GOA"],
+        'Program': ["MD", "MD", "MD"],
+        'TYPE': ["GOVT", "GOVT", "GOVT"],
+        'MAIN CODE': ["A", "B", "C"],
+    })
+    model = OrderModel(master)
+    # GOA is the last state code, which a missing State (-1) must not pick up
+    summary, orders = bulk_orders(model, master, {"student": ({"DELHI": 2, "GOA": 1}, {"MD_GOVT": 1})})
+
+    assert orders['MAIN CODE'].tolist() == ["C", "A"]
+    assert summary['Options'].tolist() == [2]
+
+
+def profiles_zip(profiles):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        for name, content in profiles.items():
+            archive.writestr(name, content)
+    buffer.seek(0)
+    return buffer
+
+
+def test_profiles_from_zip_reads_every_session():
+    content = encode_session("student", {"DELHI": 1}, {"MD_GOVT": 1})
+    profiles = profiles_from_zip(profiles_zip({"a.npz": content, "nested/b.npz": content, "notes.txt": b"x"}))
+
+    assert sorted(profiles) == ["a", "nested/b"]
+    assert profiles["a"] == ({"DELHI": 1}, {"MD_GOVT": 1})
+
+
+def test_profiles_from_zip_rejects_oversized_archives(monkeypatch):
+    content = encode_session("student", {"DELHI": 1}, {"MD_GOVT": 1})
+
+    monkeypatch.setattr(ranking_sessions, "MAX_BATCH_FILES", 2)
+    with pytest.raises(ValueError, match="Too many profiles"):
+        profiles_from_zip(profiles_zip({f"{i}.npz": content for i in range(3)}))
+
+    monkeypatch.setattr(ranking_sessions, "MAX_BATCH_BYTES", len(content) + 1)
+    with pytest.raises(ValueError, match="MB uncompressed"):
+        profiles_from_zip(profiles_zip({"a.npz": content, "b.npz": content}))
+
+
+def test_session_arrays_may_not_expand_past_the_limit():
+    # Compresses to a few KB but expands to 32 MB when loaded
+    buffer = io.BytesIO()
+    np.savez_compressed(buffer, states=np.zeros(4 * 1024 * 1024, dtype=np.int64))
+    with pytest.raises(ValueError, match="too large"):
+        decode_session(buffer.getvalue())
@@ -0,0 +1,185 @@
+import os
+import re
+import shutil
+import threading
+
+import pandas as pd
+
+from utils import metrics
+from utils.excel_reader import read_excel
+
+# Allotment results for every counselling round, stored as a hive-partitioned
+# parquet dataset:
+#
+#   data/store/allotments/year=2024/round=2/quota=All%20India/part-0.parquet
+#
+# Each round's workbook is mapped onto UNIFIED_COLUMNS, so the analysis pages can
+# query across rounds and years while reading only the partitions they need.
+
+STORE_DIR = os.path.join("data", "store", "allotments")
+PARTITION_COLUMNS = ["year", "round", "quota"]
+
+# Workbooks shipped in data/ that seed an empty store
+DEFAULT_WORKBOOKS = [
+    (os.path.join("data", "AIQR2.xlsx"), 2024, 2),
+]
+
+UNIFIED_COLUMNS = [
+    "NEET AIR",
+    "Prev Allotted Quota",
+    "Prev Allotted Institute",
+    "Prev Course",
+    "Prev Remarks",
+    "Allotted Quota",
+    "Allotted Institute",
+    "Course",
+    "Allotted Category",
+    "Candidate Category",
+    "Option No",
+    "Remarks",
+]
+
+# Column names as published by MCC, with the round prefix ("R2 Final ") removed
+_BASE_NAMES = {
+    "neet air": "NEET AIR",
+    "rank": "NEET AIR",
+    "air": "NEET AIR",
+    "allotted quota": "Allotted Quota",
+    "quota": "Allotted Quota",
+    "allotted institute": "Allotted Institute",
+    "institute": "Allotted Institute",
+    "course": "Course",
+    "allotted category": "Allotted Category",
+    "candidate category": "Candidate Category",
+    "option no": "Option No",
+    "remarks": "Remarks",
+}
+
+_ROUND_PREFIX = re.compile(r"^R(\d+)\s+(?:Final\s+)?(.*)$", re.IGNORECASE)
+
+# Reentrant: ensure_seeded holds it across the emptiness check and its ingests
+_lock = threading.RLock()
+
+
+def detect_round(columns):
+    rounds = [int(m.group(1)) for m in map(_ROUND_PREFIX.match, map(str, columns)) if m]
+    return max(rounds) if rounds else None
+
+
+def unified_name(column, round_no):
+    column = str(column).strip()
+    match = _ROUND_PREFIX.match(column)
+    column_round, base = (int(match.group(1)), match.group(2)) if match else (round_no, column)
+
+    base = re.sub(r"\s+", " ", base).strip(" .").lower().replace("alloted", "allotted")
+    name = _BASE_NAMES.get(base)
+    if name is None or name == "NEET AIR":
+        return name
+
+    if column_round == round_no:
+        return name
+    if column_round == round_no - 1 and f"Prev {name}" in UNIFIED_COLUMNS:
+        return f"Prev {name}"
+    return None
+
+
+def to_unified_schema(allotments, round_no):
+    mapping = {}
+    for column in allotments.columns:
+        name = unified_name(column, round_no)
+        if name and name not in mapping.values():
+            mapping[column] = name
+
+    unified = allotments[list(mapping)].rename(columns=mapping).reindex(columns=UNIFIED_COLUMNS)
+
+    # Typed columns; '-' placeholders become nulls
+    for column in ["NEET AIR", "Option No"]:
+        unified[column] = pd.to_numeric(unified[column], errors="coerce").astype("Int64")
+    for column in UNIFIED_COLUMNS:
+        if column not in ("NEET AIR", "Option No"):
+            text = unified[column].map(lambda x: str(x).strip() if pd.notnull(x) else None)
+            unified[column] = text.where(text != "-")
+    return unified
+
+
+class AllotmentStore:
+    def __init__(self, root=STORE_DIR):
+        self.root = root
+
+    def _partition_path(self, year, round_no):
+        return os.path.join(self.root, f"year={int(year)}", f"round={int(round_no)}")
+
+    def is_empty(self):
+        return not os.path.isdir(self.root) or not any(
+            name.startswith("year=") for name in os.listdir(self.root)
+        )
+
+    def ingest(self, workbook, year, round_no=None, sheet_name="Sheet1"):
+        # Replaces any existing data for (year, round)
+        allotments = workbook if isinstance(workbook, pd.DataFrame) else read_excel(workbook, sheet_name=sheet_name)
+
+        round_no = round_no or detect_round(allotments.columns)
+        if round_no is None:
+            raise ValueError("Could not detect the counselling round from the column names; please specify it.")
+
+        unified = to_unified_schema(allotments, int(round_no))
+        if unified["NEET AIR"].isna().all():
+            raise ValueError("Workbook has no 'NEET AIR' column.")
+
+        unified["year"] = int(year)
+        unified["round"] = int(round_no)
+        unified["quota"] = unified["Allotted Quota"].fillna("-")
+
+        with _lock:
+            shutil.rmtree(self._partition_path(year, round_no), ignore_errors=True)
+            os.makedirs(self.root, exist_ok=True)
+            unified.to_parquet(self.root, partition_cols=PARTITION_COLUMNS, index=False)
+        return len(unified)
+
+    def ensure_seeded(self):
+        # The prewarm thread and the first page render may both get here
+        with _lock:
+            if not self.is_empty():
+                return
+            for path, year, round_no in DEFAULT_WORKBOOKS:
+                if os.path.exists(path):
+                    self.ingest(path, year, round_no)
+
+    def partitions(self):
+        records = []
+        if not self.is_empty():
+            for year_dir in sorted(os.listdir(self.root)):
+                if not year_dir.startswith("year="):
+                    continue
+                for round_dir in sorted(os.listdir(os.path.join(self.root, year_dir))):
+                    if not round_dir.startswith("round="):
+                        continue
+                    records.append({
+                        "year": int(year_dir.split("=", 1)[1]),
+                        "round": int(round_dir.split("=", 1)[1]),
+                    })
+        return pd.DataFrame(records, columns=["year", "round"])
+
+    def load(self, years=None, rounds=None, quotas=None, columns=None, filters=None):
+        # Partition predicates prune directories; `filters` (pyarrow DNF) reach row groups
+        predicates = list(filters or [])
+        if years is not None:
+            predicates.append(("year", "in", [int(y) for y in years]))
+        if rounds is not None:
+            predicates.append(("round", "in", [int(r) for r in rounds]))
+        if quotas is not None:
+            predicates.append(("quota", "in", list(quotas)))
+
+        if self.is_empty():
+            return pd.DataFrame(columns=(columns or UNIFIED_COLUMNS) + ["Year", "Round"])
+
+        read_columns = None if columns is None else list(dict.fromkeys(list(columns) + ["year", "round"]))
+        allotments = pd.read_parquet(self.root, columns=read_columns, filters=predicates or None)
+        metrics.rows_processed("allotments", len(allotments))
+
+        allotments = allotments.drop(columns=["quota"], errors="ignore").rename(columns={"year": "Year", "round": "Round"})
+        for column in ["Year", "Round"]:
+            allotments[column] = allotments[column].astype(int)
+
+        sort_columns = [c for c in ["Year", "Round", "NEET AIR"] if c in allotments.columns]
+        return allotments.sort_values(sort_columns, kind="stable").reset_index(drop=True)
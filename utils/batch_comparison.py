@@ -0,0 +1,212 @@
+import glob
+import multiprocessing
+import os
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from utils.excel_reader import read_excel
+
+# Shared helpers for order comparison, plus the batch mode that validates many
+# student order workbooks against the master in a process pool.
+
+EXPECTED_COLUMNS = [
+    "MCC College Code",
+    "College Name",
+    "COURSE CODE",
+    "Program",
+    "Quota",
+    "TYPE",
+    "Student Order"
+]
+
+MAX_WORKERS = max(1, min(8, (os.cpu_count() or 2) - 1))
+
+# Limits on what a batch may hand to the worker pool
+MAX_BATCH_FILES = 500
+MAX_BATCH_BYTES = 256 * 1024 * 1024
+
+# Server folder batches may only read below this directory (unset: disabled)
+ORDERS_ROOT = os.environ.get("ETERNALS_ORDERS_DIR")
+
+# Set in each worker process by _init_worker
+_master_codes = None
+
+
+def main_code(sheet):
+    return sheet['MCC College Code'].str.strip() + "_" + sheet['COURSE CODE'].str.strip() + "_" + sheet['Quota'].str.strip()
+
+
+def prepare_comparison_sheet(comparison_sheet):
+    # Rename columns in the uploaded file
+    if len(comparison_sheet.columns) < len(EXPECTED_COLUMNS):
+        raise ValueError("Uploaded file must have at least 7 columns.")
+
+    comparison_sheet = comparison_sheet.rename(columns=dict(zip(comparison_sheet.columns[:7], EXPECTED_COLUMNS)))
+
+    # Clean and process Student Order
+    comparison_sheet['Student Order'] = pd.to_numeric(comparison_sheet['Student Order'], errors='coerce')
+    comparison_sheet = comparison_sheet.sort_values(by='Student Order')
+
+    # Create MAIN CODE
+    comparison_sheet['MAIN CODE'] = main_code(comparison_sheet)
+    return comparison_sheet
+
+
+COUNT_COLUMNS = ["Options", "Matched", "Unmatched", "Duplicates", "Missing Order"]
+
+
+def summarize_comparison(name, comparison_sheet, master_codes):
+    codes = comparison_sheet['MAIN CODE']
+    matched = codes.isin(master_codes)
+    return {
+        "File": name,
+        "Options": int(len(comparison_sheet)),
+        "Matched": int(matched.sum()),
+        "Unmatched": int((~matched).sum()),
+        "Duplicates": int(codes.duplicated(keep=False).sum()),
+        "Missing Order": int(comparison_sheet['Student Order'].isna().sum()),
+        "Error": None,
+    }
+
+
+def _init_worker(master_codes):
+    global _master_codes
+    _master_codes = master_codes
+
+
+def _compare_file(item):
+    name, content = item
+    try:
+        comparison_sheet = prepare_comparison_sheet(read_excel(content, sheet_name='Sheet1', dtype=str))
+    except Exception as e:
+        return {"File": name, "Error": str(e)}, []
+    summary = summarize_comparison(name, comparison_sheet, _master_codes)
+    return summary, comparison_sheet['MAIN CODE'].dropna().unique().tolist()
+
+
+def resolve_order_folder(folder, root=ORDERS_ROOT):
+    # `folder` is relative to `root`; paths that resolve outside it are rejected
+    if not root:
+        raise ValueError("Reading order files from the server is not enabled.")
+    root = os.path.realpath(root)
+    path = os.path.realpath(os.path.join(root, folder))
+    if os.path.commonpath([root, path]) != root:
+        raise ValueError(f"Folder '{folder}' is outside the order files directory.")
+    if not os.path.isdir(path):
+        raise ValueError(f"Folder '{folder}' does not exist.")
+    return path
+
+
+def _check_batch(count, total_bytes):
+    if count > MAX_BATCH_FILES:
+        raise ValueError(f"Too many order files (more than {MAX_BATCH_FILES}).")
+    if total_bytes > MAX_BATCH_BYTES:
+        raise ValueError(f"Order files exceed {MAX_BATCH_BYTES // (1024 * 1024)} MB uncompressed.")
+
+
+def collect_order_files(zip_file=None, folder=None, root=ORDERS_ROOT):
+    # (name, bytes) pairs from an uploaded zip and/or a folder below `root`
+    files = []
+    if zip_file is not None:
+        try:
+            archive = zipfile.ZipFile(zip_file)
+        except zipfile.BadZipFile as e:
+            raise ValueError(f"Not a zip archive ({e}).") from e
+        with archive:
+            members = [
+                info for info in archive.infolist()
+                if not info.is_dir()
+                and os.path.basename(info.filename).lower().endswith(".xlsx")
+                and not os.path.basename(info.filename).startswith(("~$", "._"))
+            ]
+            # Checked on the declared sizes before anything is decompressed
+            _check_batch(len(members), sum(info.file_size for info in members))
+            for info in members:
+                files.append((info.filename, archive.read(info)))
+    if folder:
+        path = resolve_order_folder(folder, root)
+        real_root = os.path.realpath(root)
+        paths = [
+            p for p in sorted(glob.glob(os.path.join(path, "**", "*.xlsx"), recursive=True))
+            if not os.path.basename(p).startswith("~$")
+            and os.path.commonpath([real_root, os.path.realpath(p)]) == real_root
+        ]
+        _check_batch(len(files) + len(paths), sum(len(content) for _, content in files) + sum(os.path.getsize(p) for p in paths))
+        for p in paths:
+            with open(p, "rb") as f:
+                files.append((os.path.relpath(p, path), f.read()))
+    return files
+
+
+def batch_compare(files, master_sheet, max_workers=MAX_WORKERS):
+    # Returns a per-file summary frame and the chosen MAIN CODEs per file
+    master_codes = frozenset(main_code(master_sheet).dropna())
+
+    if len(files) > 1 and max_workers > 1:
+        # Spawned, not forked: a fork of the threaded server could inherit a held lock
+        # (logging, metrics, parse timings) and hang in read_excel
+        with ProcessPoolExecutor(
+            max_workers=max_workers, mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker, initargs=(master_codes,)
+        ) as pool:
+            results = list(pool.map(_compare_file, files, chunksize=max(1, len(files) // (max_workers * 4))))
+    else:
+        _init_worker(master_codes)
+        results = [_compare_file(item) for item in files]
+
+    # Counts stay integers even when error rows leave them empty
+    summary = pd.DataFrame(
+        [summary for summary, _ in results], columns=["File"] + COUNT_COLUMNS + ["Error"]
+    ).astype({column: "Int64" for column in COUNT_COLUMNS})
+    codes_by_file = {summary["File"]: codes for summary, codes in results if not summary.get("Error")}
+    return summary, codes_by_file
+
+
+def overlap_matrix(codes_by_file):
+    # Shared-option counts and Jaccard similarity between every pair of files
+    names = list(codes_by_file)
+    if not names:
+        empty = pd.DataFrame()
+        return empty, empty
+
+    lengths = np.array([len(codes_by_file[name]) for name in names])
+    all_codes = np.concatenate([np.asarray(codes_by_file[name], dtype=object) for name in names]) if lengths.sum() else np.array([], dtype=object)
+    code_ids, _ = pd.factorize(all_codes)
+
+    # Files x codes indicator matrix; overlaps are a single matrix product
+    indicator = np.zeros((len(names), code_ids.max() + 1 if len(code_ids) else 0), dtype=np.float32)
+    indicator[np.repeat(np.arange(len(names)), lengths), code_ids] = 1
+    shared = indicator @ indicator.T
+
+    sizes = indicator.sum(axis=1)
+    union = sizes[:, None] + sizes[None, :] - shared
+    jaccard = np.divide(shared, union, out=np.zeros_like(shared), where=union > 0)
+
+    shared = pd.DataFrame(shared.astype(int), index=names, columns=names)
+    jaccard = pd.DataFrame(jaccard.round(3), index=names, columns=names)
+    return shared, jaccard
+
+
+def validation_report_sheets(comparison_sheet, master_sheet, merged_data):
+    # Export bundle mirroring the Validation tab
+    missing_in_master = comparison_sheet[~comparison_sheet['MAIN CODE'].isin(master_sheet['MAIN CODE'])]
+    missing_in_comparison = master_sheet[~master_sheet['MAIN CODE'].isin(comparison_sheet['MAIN CODE'])]
+    duplicate_in_uploaded = comparison_sheet[comparison_sheet.duplicated(subset=['MAIN CODE'], keep=False)]
+    duplicate_in_master = master_sheet[master_sheet.duplicated(subset=['MAIN CODE'], keep=False)]
+    missing_values = merged_data[merged_data.isnull().any(axis=1)]
+
+    sheets = [
+        ("Unmatched in Upload", missing_in_master),
+        ("Unmatched in Master", missing_in_comparison),
+        ("Duplicates in Upload", duplicate_in_uploaded),
+        ("Duplicates in Master", duplicate_in_master),
+        ("Missing Values", missing_values),
+    ]
+    summary = pd.DataFrame({
+        "Check": ["Uploaded Options"] + [name for name, _ in sheets],
+        "Rows": [len(comparison_sheet)] + [len(frame) for _, frame in sheets],
+    })
+    return [("Summary", summary)] + sheets
@@ -0,0 +1,60 @@
+import sys
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+
+def estimate_size(value):
+    # Rough in-memory size in bytes, good enough for eviction decisions
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        return int(value.memory_usage(deep=True).sum()) if isinstance(value, pd.DataFrame) else int(value.memory_usage(deep=True))
+    if isinstance(value, (bytes, bytearray)):
+        return len(value)
+    if isinstance(value, dict):
+        return sum(estimate_size(v) for v in value.values()) + sys.getsizeof(value)
+    if isinstance(value, (list, tuple)):
+        return sum(estimate_size(v) for v in value) + sys.getsizeof(value)
+    return sys.getsizeof(value)
+
+
+class ByteLRUCache:
+    # Thread-safe LRU cache bounded by the total estimated size of its values
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._items
+
+    def __len__(self):
+        return len(self._items)
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key not in self._items:
+                return default
+            self._items.move_to_end(key)
+            return self._items[key][0]
+
+    def put(self, key, value):
+        size = estimate_size(value)
+        with self._lock:
+            if key in self._items:
+                self.current_bytes -= self._items.pop(key)[1]
+            if size > self.max_bytes:
+                return
+            self._items[key] = (value, size)
+            self.current_bytes += size
+            while self.current_bytes > self.max_bytes:
+                _, (_, evicted_size) = self._items.popitem(last=False)
+                self.current_bytes -= evicted_size
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self.current_bytes = 0
@@ -0,0 +1,102 @@
+import hashlib
+import io
+
+import numpy as np
+import pandas as pd
+import seaborn as sns
+from matplotlib.figure import Figure
+
+from utils import metrics
+from utils.cache import ByteLRUCache
+
+# Rendered Graph Analysis charts, kept as PNG bytes.
+#
+# A chart is identified by the dataset, the filter mask and the plot settings, so
+# reruns caused by other widgets (or tabs) reuse the image instead of redrawing a
+# seaborn figure. Bootstrap CIs (line / bar) and the histogram KDE are estimated
+# on at most MAX_ESTIMATOR_ROWS sampled rows.
+
+MAX_CHART_BYTES = 64 * 1024 * 1024
+MAX_ESTIMATOR_ROWS = 20_000
+KDE_POINTS = 200
+
+_charts = ByteLRUCache(MAX_CHART_BYTES)
+
+
+def mask_hash(mask):
+    return hashlib.sha256(np.packbits(np.asarray(mask, dtype=bool)).tobytes() + str(len(mask)).encode()).hexdigest()
+
+
+def estimator_sample(data):
+    # Bounded, reproducible sample for the estimators; returns (sample, sampled?)
+    if len(data) <= MAX_ESTIMATOR_ROWS:
+        return data, False
+    return data.sample(n=MAX_ESTIMATOR_ROWS, random_state=0), True
+
+
+def _kde_counts(values, sample, bins):
+    # Gaussian KDE (Scott's bandwidth) of `sample`, scaled to the histogram's counts
+    sample = sample.astype(float)
+    bandwidth = sample.std(ddof=1) * len(sample) ** (-1 / 5)
+    if not np.isfinite(bandwidth) or bandwidth == 0:
+        return None, None
+    grid = np.linspace(values.min(), values.max(), KDE_POINTS)
+    density = np.zeros_like(grid)
+    for chunk in np.array_split(sample, max(1, len(sample) // 2000)):
+        density += np.exp(-0.5 * ((grid[:, None] - chunk[None, :]) / bandwidth) ** 2).sum(axis=1)
+    density /= len(sample) * bandwidth * np.sqrt(2 * np.pi)
+    bin_width = (values.max() - values.min()) / bins
+    return grid, density * len(values) * bin_width
+
+
+def _render(data, graph_type, x_axis, y_axis, hue, style):
+    fig = Figure(figsize=(12, 8))
+    ax = fig.subplots()
+    sampled = False
+
+    if graph_type == "Scatter Plot":
+        sns.scatterplot(
+            data=data,
+            x=x_axis,
+            y=y_axis,
+            hue=hue if hue else None,
+            style=style if style else None,
+            ax=ax,
+            s=50  # Marker size
+        )
+
+    elif graph_type == "Line Plot":
+        sample, sampled = estimator_sample(data)
+        sns.lineplot(data=sample, x=x_axis, y=y_axis, ax=ax)
+
+    elif graph_type == "Bar Chart":
+        sample, sampled = estimator_sample(data)
+        sns.barplot(data=sample, x=x_axis, y=y_axis, ax=ax)
+
+    elif graph_type == "Histogram":
+        values = data[x_axis].dropna()
+        numeric = pd.api.types.is_numeric_dtype(values) and not pd.api.types.is_bool_dtype(values)
+        if numeric and len(values) > MAX_ESTIMATOR_ROWS:
+            # Bars from every row, KDE from the sample
+            sns.histplot(data=data, x=x_axis, bins=20, kde=False, ax=ax)
+            sample, sampled = estimator_sample(values)
+            grid, counts = _kde_counts(values.to_numpy(dtype=float), sample.to_numpy(), 20)
+            if grid is not None:
+                ax.plot(grid, counts, color=sns.color_palette()[0])
+        else:
+            sns.histplot(data=data, x=x_axis, bins=20, kde=numeric, ax=ax)
+
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format="png")
+    return buffer.getvalue(), sampled
+
+
+def render_chart(data_key, filter_key, load, graph_type, x_axis, y_axis, hue=None, style=None):
+    # Returns (png bytes, sampled?); `load()` fetches the filtered rows, only on a miss
+    key = (data_key, filter_key, graph_type, x_axis, y_axis, hue, style)
+    chart = _charts.get(key)
+    metrics.cache_result("charts", hit=chart is not None)
+    if chart is None:
+        chart = _render(load(), graph_type, x_axis, y_axis, hue, style)
+        _charts.put(key, chart)
+    return chart
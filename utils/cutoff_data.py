@@ -0,0 +1,140 @@
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from utils.eligibility import EligibilityEngine
+from utils.shared_frames import allotments_view, allotments_generation, shared_derived
+
+# Cleaned allotments and the tables the cutoff page derives from them. Each is
+# computed once per (years, rounds) selection and shared by every session, so the
+# startup prewarm (utils.prewarm) and the page hit the same cache entries.
+
+
+def prepare_cutoff_data(aiqr2_data):
+    # Clean and prepare data (nullable integer columns are widened so '-' fits)
+    aiqr2_data = aiqr2_data.astype({col: object for col in aiqr2_data.select_dtypes(include=['Int64']).columns})
+    aiqr2_data = aiqr2_data.fillna("-")
+
+    # Ensure NEET AIR is numeric for proper sorting and calculations
+    aiqr2_data['NEET AIR'] = pd.to_numeric(aiqr2_data['NEET AIR'], errors='coerce')
+    aiqr2_data['NEET AIR'] = aiqr2_data['NEET AIR'].apply(lambda x: int(x) if pd.notnull(x) else '-')
+
+    # Collapse AFMS-related remarks
+    aiqr2_data['Remarks'] = aiqr2_data['Remarks'].replace(
+        to_replace=r'Fresh Allotted in (\w+) Round\( AFMS Rank : \d+ \)',
+        value=r'Fresh Allotted in \1 Round (AFMS)',
+        regex=True
+    )
+
+    # Replace '-' in previous round remarks with 'R<n> Not Allotted'
+    aiqr2_data['Prev Remarks'] = aiqr2_data['Prev Remarks'].mask(
+        aiqr2_data['Prev Remarks'] == '-',
+        'R' + (aiqr2_data['Round'] - 1).astype(str) + ' Not Allotted'
+    )
+    return aiqr2_data
+
+
+def _key(name, years, rounds, *rest):
+    return (name, tuple(years), tuple(rounds), allotments_generation()) + rest
+
+
+def cutoff_data(years, rounds):
+    prepared = shared_derived(
+        _key("cutoff_data", years, rounds),
+        lambda: prepare_cutoff_data(allotments_view(years, rounds)),
+        cache="aiqr2"
+    )
+    return prepared.copy(deep=False)
+
+
+def cutoff_pivot(years, rounds, quota):
+    # Maximum NEET AIR by Course and Allotted Category for one quota
+    def compute():
+        aiqr2_data = cutoff_data(years, rounds)
+        filtered_data = aiqr2_data[aiqr2_data['Allotted Quota'] == quota]
+        return filtered_data.pivot_table(
+            values='NEET AIR',
+            index='Course',
+            columns='Allotted Category',
+            aggfunc='max',
+            fill_value=0
+        )
+    return shared_derived(_key("cutoff_pivot", years, rounds, quota), compute, cache="pivots")
+
+
+def remarks_matrix(years, rounds):
+    # (Prev Remarks, Remarks) counts, long and as a transition matrix
+    def compute():
+        aiqr2_data = cutoff_data(years, rounds)
+        combined_remarks_analysis = aiqr2_data.groupby(['Prev Remarks', 'Remarks']).size().reset_index(name='Count')
+        pivot_data = combined_remarks_analysis.pivot(
+            index='Prev Remarks', columns='Remarks', values='Count'
+        ).fillna(0)
+        return combined_remarks_analysis, pivot_data
+    return shared_derived(_key("remarks_matrix", years, rounds), compute, cache="pivots")
+
+
+@st.cache_resource(max_entries=8, show_spinner=False)
+def _eligibility_engine(years, rounds, generation):
+    return EligibilityEngine(allotments_view(years, rounds))
+
+
+def eligibility_engine(years, rounds):
+    return _eligibility_engine(tuple(years), tuple(rounds), allotments_generation())
+
+
+def typed_cutoff_data(years, rounds):
+    # cutoff_data with numeric columns that hold '-' placeholders (NEET AIR, Option
+    # No, Year, Round) as numbers, the '-' read as missing; for filters and plots
+    def compute():
+        aiqr2_data = cutoff_data(years, rounds)
+        typed = {}
+        for column in aiqr2_data.columns:
+            values = aiqr2_data[column]
+            if pd.api.types.is_numeric_dtype(values):
+                continue
+            # Decided on the distinct values, which are far fewer than the rows
+            uniques = pd.Series(values.unique())
+            present = uniques[uniques.notna() & (uniques.astype(str) != '-')]
+            if not present.empty and pd.to_numeric(present, errors='coerce').notna().all():
+                typed[column] = pd.to_numeric(values.mask(values.astype(str) == '-'), errors='coerce')
+        return aiqr2_data.assign(**typed)
+    return shared_derived(_key("typed_cutoff_data", years, rounds), compute, cache="aiqr2").copy(deep=False)
+
+
+def cutoff_value_sets(years, rounds):
+    # Per text column of typed_cutoff_data: (row codes, distinct values), so filter
+    # options need no unique() over the rows on each rerun
+    def compute():
+        typed = typed_cutoff_data(years, rounds)
+        return {
+            column: pd.factorize(typed[column])
+            for column in typed.columns
+            if not pd.api.types.is_numeric_dtype(typed[column])
+        }
+    return shared_derived(_key("cutoff_value_sets", years, rounds), compute, cache="aiqr2")
+
+
+def value_options(value_set, mask=None):
+    # Distinct values in first-seen order, limited to the rows in `mask` (a bool array)
+    codes, uniques = value_set
+    if mask is None:
+        return uniques.tolist()
+    codes = codes[mask]
+    present = np.bincount(codes[codes >= 0], minlength=len(uniques)) > 0
+    return uniques[present].tolist()
+
+
+def cutoff_cube_sheets(years, rounds):
+    # Export bundle: closing/opening rank per (quota, course, category), then the
+    # course x category pivot of every quota
+    def compute():
+        aiqr2_data = cutoff_data(years, rounds)
+        allotted = (aiqr2_data['NEET AIR'] != '-') & (aiqr2_data['Allotted Quota'] != '-')
+        ranked = aiqr2_data[allotted].astype({'NEET AIR': int})
+        cube = ranked.groupby(['Allotted Quota', 'Course', 'Allotted Category']).agg(
+            **{'Closing Rank': ('NEET AIR', 'max'), 'Opening Rank': ('NEET AIR', 'min'), 'Allotments': ('NEET AIR', 'size')}
+        )
+        quotas = sorted(ranked['Allotted Quota'].unique(), key=str)
+        return [("Cutoff Cube", cube)] + [(str(quota), cutoff_pivot(years, rounds, quota)) for quota in quotas]
+    return shared_derived(_key("cutoff_cube", years, rounds), compute, cache="pivots")
@@ -0,0 +1,115 @@
+import numpy as np
+import pandas as pd
+
+# Rank-to-seat eligibility: closing ranks (max allotted NEET AIR) per
+# (quota, category, course, institute), kept as one ascending array per
+# (quota, category). A seat is reachable for AIR X when X <= closing rank, so the
+# reachable seats are always the suffix starting at searchsorted(closing, X).
+
+GROUP_COLUMNS = ["Allotted Quota", "Allotted Category"]
+SEAT_COLUMNS = ["Course", "Allotted Institute"]
+
+
+def text_key(values):
+    # Case/punctuation-insensitive key used to line allotment names up with the master
+    return (
+        values.astype(str).str.upper()
+        .str.replace(r"[^A-Z0-9]+", " ", regex=True)
+        .str.strip()
+    )
+
+
+def institute_key(values):
+    # Allotment institutes repeat the name plus an address after " , "; master names
+    # sometimes carry the MCC college code in brackets
+    names = values.astype(str).str.replace(r"\(\d+\)\s*$", "", regex=True).str.split(" , ").str[0]
+    return text_key(names)
+
+
+class EligibilityEngine:
+    def __init__(self, allotments):
+        seats = allotments.dropna(subset=GROUP_COLUMNS + SEAT_COLUMNS + ["NEET AIR"])
+        seats = seats[(seats[GROUP_COLUMNS + SEAT_COLUMNS] != "-").all(axis=1)]
+        seats = seats.assign(**{"NEET AIR": pd.to_numeric(seats["NEET AIR"], errors="coerce")}).dropna(subset=["NEET AIR"])
+
+        closing = (
+            seats.groupby(GROUP_COLUMNS + SEAT_COLUMNS, observed=True)["NEET AIR"]
+            .agg(["max", "min", "count"])
+            .rename(columns={"max": "Closing Rank", "min": "Opening Rank", "count": "Seats Allotted"})
+            .reset_index()
+            .sort_values(GROUP_COLUMNS + ["Closing Rank"], kind="stable")
+            .reset_index(drop=True)
+        )
+        self.seats = closing
+
+        # Per-group slices into `seats`, plus the sorted closing ranks for binary search
+        ranks = closing["Closing Rank"].to_numpy(dtype=np.int64)
+        self._groups = {}
+        for key, rows in closing.groupby(GROUP_COLUMNS, observed=True).indices.items():
+            self._groups[key] = (rows[0], ranks[rows])
+
+    @property
+    def quotas(self):
+        return sorted({quota for quota, _ in self._groups})
+
+    def categories(self, quota=None):
+        return sorted({category for q, category in self._groups if quota is None or q == quota})
+
+    def _slice(self, quota, category):
+        if (quota, category) not in self._groups:
+            return 0, np.empty(0, dtype=np.int64)
+        return self._groups[(quota, category)]
+
+    def reachable(self, air, quota, category):
+        start, closing = self._slice(quota, category)
+        position = int(np.searchsorted(closing, air, side="left"))
+        result = self.seats.iloc[start + position:start + len(closing)].copy()
+        result["Margin"] = result["Closing Rank"] - air
+        return result.sort_values("Margin").reset_index(drop=True)
+
+    def reachable_counts(self, airs, quota, category):
+        _, closing = self._slice(quota, category)
+        airs = np.asarray(airs, dtype=np.int64)
+        return len(closing) - np.searchsorted(closing, airs, side="left")
+
+    def reachable_many(self, airs, quota, category):
+        # Long frame of (NEET AIR, seat) pairs for many AIRs without a Python loop
+        start, closing = self._slice(quota, category)
+        airs = np.asarray(airs, dtype=np.int64)
+        positions = np.searchsorted(closing, airs, side="left")
+        counts = len(closing) - positions
+
+        offsets = np.repeat(np.cumsum(counts) - counts, counts)
+        seat_rows = start + np.repeat(positions, counts) + (np.arange(counts.sum()) - offsets)
+
+        result = self.seats.iloc[seat_rows].reset_index(drop=True)
+        result.insert(0, "NEET AIR", np.repeat(airs, counts))
+        result["Margin"] = result["Closing Rank"] - result["NEET AIR"]
+        return result
+
+
+def join_master(eligible, master_sheet):
+    # Attach master details (MAIN CODE, State, Fees, ...) by quota, institute and course
+    master = master_sheet.assign(
+        _quota=text_key(master_sheet["TYPE"]),
+        _institute=institute_key(master_sheet["College Name"]),
+        _course=text_key(master_sheet["Program"]),
+    ).drop_duplicates(subset=["_quota", "_institute", "_course"])
+
+    keyed = eligible.assign(
+        _quota=text_key(eligible["Allotted Quota"]),
+        _institute=institute_key(eligible["Allotted Institute"]),
+        _course=text_key(eligible["Course"]),
+    )
+    master_columns = [c for c in master.columns if c not in eligible.columns]
+    merged = keyed.merge(master[master_columns], on=["_quota", "_institute", "_course"], how="left")
+    return merged.drop(columns=["_quota", "_institute", "_course"])
+
+
+def join_order(eligible, ordered_data):
+    # `eligible` must already carry the master columns (see join_master)
+    key_columns = ["MCC College Code", "COURSE CODE", "Quota"]
+    if not set(key_columns + ["Order Number"]).issubset(ordered_data.columns) or not set(key_columns).issubset(eligible.columns):
+        return eligible
+    orders = ordered_data[key_columns + ["Order Number"]].drop_duplicates(subset=key_columns)
+    return eligible.merge(orders, on=key_columns, how="left")
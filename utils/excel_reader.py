@@ -0,0 +1,217 @@
+import io
+import logging
+import os
+import threading
+import time
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+from utils import metrics
+
+# Shared Excel reader for every loader in the app.
+#
+# Only the requested columns are materialised. Rows are streamed from openpyxl in
+# read-only mode (no full in-memory workbook), or read with python-calamine when
+# it is installed. Every sheet read is timed and kept in PARSE_TIMES.
+#
+# openpyxl still parses the XML of every row, so with it a column projection
+# mostly saves memory and value conversion: reads are bounded to the span of the
+# requested columns, which only helps when they sit close together.
+
+logger = logging.getLogger(__name__)
+
+try:
+    import python_calamine  # noqa: F401
+    FAST_BACKEND = "calamine"
+except ImportError:
+    FAST_BACKEND = None
+
+PARSE_TIMES = deque(maxlen=200)
+_times_lock = threading.Lock()
+
+
+def _source_name(source):
+    if isinstance(source, (str, os.PathLike)):
+        return os.path.basename(source)
+    return getattr(source, "name", "upload")
+
+
+def _rewind(source):
+    if hasattr(source, "seek"):
+        source.seek(0)
+    return source
+
+
+def _record(source, sheet_name, frame, seconds, backend):
+    record = {
+        "File": _source_name(source),
+        "Sheet": sheet_name,
+        "Rows": len(frame),
+        "Columns": len(frame.columns),
+        "Seconds": round(seconds, 3),
+        "Backend": backend,
+    }
+    with _times_lock:
+        PARSE_TIMES.append(record)
+    metrics.observe("eternals_excel_parse_seconds", seconds, backend=backend)
+    metrics.rows_processed("excel", len(frame))
+    logger.info("Parsed %(File)s[%(Sheet)s]: %(Rows)d rows x %(Columns)d columns in %(Seconds).3fs (%(Backend)s)", record)
+
+
+def recent_parse_times():
+    with _times_lock:
+        return pd.DataFrame(list(PARSE_TIMES), columns=["File", "Sheet", "Rows", "Columns", "Seconds", "Backend"])
+
+
+def _dedupe(header):
+    # Same convention as pandas: repeated names become 'A', 'A.1', ...
+    seen = {}
+    names = []
+    for i, name in enumerate(header):
+        name = f"Unnamed: {i}" if name is None else str(name) if not isinstance(name, str) else name
+        if name in seen:
+            seen[name] += 1
+            name = f"{name}.{seen[name]}"
+        else:
+            seen[name] = 0
+        names.append(name)
+    return names
+
+
+# Strings pandas treats as missing by default
+NA_STRINGS = {
+    "", "#N/A", "#N/A N/A", "#NA", "-1.#IND", "-1.#QNAN", "-NaN", "-nan", "1.#IND", "1.#QNAN",
+    "<NA>", "N/A", "NA", "NULL", "NaN", "None", "n/a", "nan", "null",
+}
+
+
+def _clean(value):
+    # Empty cells and NA strings read as NaN, as with pd.read_excel
+    if value is None or (isinstance(value, str) and value in NA_STRINGS):
+        return np.nan
+    return value
+
+
+def _missing(value):
+    return isinstance(value, float) and value != value
+
+
+def _infer_column(values):
+    # Numeric-only object columns become numbers, as pd.read_excel would do
+    if values.dtype != object:
+        return values
+    non_null = values.dropna()
+    if non_null.empty:
+        return values.astype(float)
+    if all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in non_null):
+        return pd.to_numeric(values)
+    return values
+
+
+def _text(value):
+    if _missing(value):
+        return np.nan
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def _read_sheet_streaming(worksheet, columns, dtype):
+    header = _dedupe(next(worksheet.iter_rows(values_only=True, max_row=1), ()))
+
+    if columns is None:
+        positions = list(range(len(header)))
+    else:
+        missing = [c for c in columns if c not in header]
+        if missing:
+            raise ValueError(f"Columns not found in sheet '{worksheet.title}': {', '.join(missing)}")
+        positions = [header.index(c) for c in columns]
+
+    # Only cells between the first and last requested column are read
+    first = min(positions, default=0)
+    width = max(positions, default=-1) - first + 1
+    offsets = [p - first for p in positions]
+    data = []
+    if width > 0:
+        for row in worksheet.iter_rows(min_row=2, min_col=first + 1, max_col=first + width, values_only=True):
+            if len(row) < width:
+                row = tuple(row) + (None,) * (width - len(row))
+            data.append(tuple(_clean(row[o]) for o in offsets))
+
+    # Trailing blank rows are common in read-only mode
+    while data and all(_missing(value) for value in data[-1]):
+        data.pop()
+
+    names = [header[p] for p in positions]
+    if dtype is str:
+        data = [tuple(_text(value) for value in row) for row in data]
+        return pd.DataFrame.from_records(data, columns=names, coerce_float=False)
+    frame = pd.DataFrame.from_records(data, columns=names, coerce_float=True)
+    frame = frame.apply(_infer_column) if len(frame.columns) else frame
+    if dtype is not None:
+        frame = frame.astype(dtype)
+    return frame
+
+
+def read_header(source, sheet_name=0):
+    # Column names only; reads the first row of the sheet
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(_rewind(source), read_only=True, data_only=True)
+    try:
+        worksheet = workbook.worksheets[sheet_name] if isinstance(sheet_name, int) else workbook[sheet_name]
+        return _dedupe(next(worksheet.iter_rows(values_only=True, max_row=1), ()))
+    finally:
+        workbook.close()
+
+
+def read_excel(source, sheet_name=0, columns=None, dtype=None):
+    # Like pd.read_excel(source, sheet_name, usecols=columns, dtype=dtype).
+    # `sheet_name` may be a name, an index, a list of either, or None for all sheets;
+    # lists and None return {sheet name: frame}.
+    if isinstance(source, (bytes, bytearray)):
+        source = io.BytesIO(source)
+
+    if FAST_BACKEND:
+        frames = {}
+        wanted = sheet_name if isinstance(sheet_name, list) or sheet_name is None else [sheet_name]
+        all_sheets = pd.ExcelFile(_rewind(source), engine=FAST_BACKEND)
+        names = all_sheets.sheet_names if wanted is None else [all_sheets.sheet_names[s] if isinstance(s, int) else s for s in wanted]
+        for name in names:
+            start = time.perf_counter()
+            frame = all_sheets.parse(name, usecols=columns, dtype=dtype)
+            _record(source, name, frame, time.perf_counter() - start, FAST_BACKEND)
+            frames[name] = frame
+        return frames if isinstance(sheet_name, list) or sheet_name is None else frames[names[0]]
+
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(_rewind(source), read_only=True, data_only=True)
+    try:
+        if sheet_name is None:
+            wanted = workbook.sheetnames
+        elif isinstance(sheet_name, list):
+            wanted = sheet_name
+        else:
+            wanted = [sheet_name]
+
+        frames = {}
+        for name in wanted:
+            if isinstance(name, int):
+                worksheet = workbook.worksheets[name]
+            elif name in workbook.sheetnames:
+                worksheet = workbook[name]
+            else:
+                raise ValueError(f"Worksheet named '{name}' not found")
+            start = time.perf_counter()
+            frame = _read_sheet_streaming(worksheet, columns, dtype)
+            _record(source, worksheet.title, frame, time.perf_counter() - start, "openpyxl read-only")
+            frames[name if not isinstance(name, int) else worksheet.title] = frame
+    finally:
+        workbook.close()
+
+    if isinstance(sheet_name, list) or sheet_name is None:
+        return frames
+    return next(iter(frames.values()))
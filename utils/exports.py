@@ -0,0 +1,169 @@
+import gzip
+import hashlib
+import io
+import os
+import re
+import threading
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+from utils import metrics
+from utils.cache import ByteLRUCache
+from utils.master_store import arrow_safe
+
+# Export bundles built off the rerun path.
+#
+# A bundle is a list of (sheet name, frame) pairs written as one XLSX workbook,
+# a zip of parquet files, a zip of gzipped CSVs, or (single sheet) a plain CSV.
+# Download buttons get a callable, so nothing is hashed or built until the user
+# clicks. The build then runs in a small thread pool, which also bounds how many
+# builds run at once and joins concurrent requests for the same bundle. Results
+# are cached by a hash of the input, so a second click, or the same bundle in
+# another session, reuses the bytes. Small CSVs are written inline.
+
+MAX_EXPORT_BYTES = 256 * 1024 * 1024
+EXPORT_WORKERS = max(1, min(2, (os.cpu_count() or 2) - 1))
+INLINE_CSV_CELLS = 100_000
+
+BUNDLE_FORMATS = {
+    "xlsx": ("Excel", "xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+    "parquet": ("Parquet", "parquet.zip", "application/zip"),
+    "csv.gz": ("CSV (gzip)", "csv.zip", "application/zip"),
+}
+
+_executor = None
+_built = ByteLRUCache(MAX_EXPORT_BYTES)
+_jobs = {}
+_lock = threading.RLock()
+
+
+def _pool():
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=EXPORT_WORKERS, thread_name_prefix="export")
+        return _executor
+
+
+def bundle_hash(sheets, fmt, index=False):
+    digest = hashlib.sha256(f"{fmt}|{index}".encode())
+    for name, frame in sheets:
+        digest.update(str(name).encode())
+        digest.update(repr(list(frame.columns)).encode())
+        digest.update(repr(list(frame.index.names)).encode())
+        digest.update(pd.util.hash_pandas_object(frame, index=index).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+def _flat(frame):
+    # Parquet and Excel need plain string column names
+    frame = frame.copy(deep=False)
+    if isinstance(frame.columns, pd.MultiIndex):
+        frame.columns = [" | ".join(str(level) for level in column if str(level)) for column in frame.columns]
+    else:
+        frame.columns = [str(column) for column in frame.columns]
+    return frame
+
+
+def _sheet_names(sheets):
+    # Excel limits: 31 characters, no []:*?/\, unique (case-insensitive)
+    names, seen = [], set()
+    for name, _ in sheets:
+        base = re.sub(r"[\[\]:*?/\\]", "_", str(name))[:31] or "Sheet"
+        candidate, i = base, 1
+        while candidate.lower() in seen:
+            suffix = f" ({i})"
+            candidate = base[:31 - len(suffix)] + suffix
+            i += 1
+        seen.add(candidate.lower())
+        names.append(candidate)
+    return names
+
+
+def build_bundle(sheets, fmt, index=False):
+    names = _sheet_names(sheets)
+    frames = [frame for _, frame in sheets]
+
+    if fmt == "csv":
+        return frames[0].to_csv(index=index).encode()
+
+    if fmt == "xlsx":
+        buffer = io.BytesIO()
+        with pd.ExcelWriter(buffer, engine="openpyxl") as writer:
+            for name, frame in zip(names, frames):
+                frame = _flat(frame) if not index else frame
+                frame.to_excel(writer, sheet_name=name, index=index)
+        return buffer.getvalue()
+
+    # Members are compressed already, so the zip only stores them
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", compression=zipfile.ZIP_STORED) as archive:
+        for name, frame in zip(names, frames):
+            if fmt == "parquet":
+                # Parquet columns hold one type; mixed number/text columns become text
+                frame = arrow_safe(_flat(frame.reset_index() if index else frame))
+                archive.writestr(f"{name}.parquet", frame.to_parquet(index=False))
+            elif fmt == "csv.gz":
+                archive.writestr(f"{name}.csv.gz", gzip.compress(frame.to_csv(index=index).encode()))
+            else:
+                raise ValueError(f"Unknown export format '{fmt}'.")
+    return buffer.getvalue()
+
+
+def _finish(key, future):
+    if future.exception() is None:
+        _built.put(key, future.result())
+    with _lock:
+        _jobs.pop(key, None)
+
+
+def submit_export(sheets, fmt, index=False):
+    # Returns (key, future); future is None when the bundle is already cached
+    key = bundle_hash(sheets, fmt, index)
+    with _lock:
+        if key in _built:
+            metrics.cache_result("exports", hit=True)
+            return key, None
+        metrics.cache_result("exports", hit=False)
+        future = _jobs.get(key)
+        if future is None:
+            future = _pool().submit(build_bundle, sheets, fmt, index)
+            _jobs[key] = future
+            future.add_done_callback(lambda done: _finish(key, done))
+    return key, future
+
+
+def build_export(sheets, fmt, index=False):
+    # Cached bytes of a bundle, building it (once, even across sessions) if needed
+    key, future = submit_export(sheets, fmt, index)
+    if future is not None:
+        return future.result()
+    data = _built.get(key)
+    return data if data is not None else build_bundle(sheets, fmt, index)
+
+
+def export_data(sheets, fmt, index=False):
+    # st.download_button data: small CSVs inline, anything else built on click
+    if fmt == "csv" and sheets[0][1].size <= INLINE_CSV_CELLS:
+        return build_bundle(sheets, fmt, index)
+    return lambda: build_export(sheets, fmt, index)
+
+
+def export_buttons(name, sheets, file_name, index=False, formats=tuple(BUNDLE_FORMATS)):
+    # One download button per bundle format; each is built when it is clicked
+    import streamlit as st
+
+    columns = st.columns(len(formats))
+    for column, fmt in zip(columns, formats):
+        label, extension, mime = BUNDLE_FORMATS[fmt]
+        with column:
+            st.download_button(
+                label=f"Download {name} ({label})",
+                data=export_data(sheets, fmt, index),
+                file_name=f"{file_name}.{extension}",
+                mime=mime,
+                key=f"export_{file_name}_{fmt}",
+                on_click="ignore"
+            )
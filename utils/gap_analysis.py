@@ -0,0 +1,69 @@
+import numpy as np
+import pandas as pd
+
+# Cutoff-vs-order gap analysis for one student order (comparison merged with the
+# master). For a student's AIR and category every option gets, in one vectorized
+# pass over the order:
+#
+#   Margin        cutoff - AIR; >= 0 means the AIR is inside the last cutoff
+#   Reachable     Margin >= 0 (options without a cutoff are never reachable)
+#   Dead          unreachable option with a known cutoff, ranked above at least
+#                 one reachable option
+#
+# Options are taken in Student Order; options without an order sort last.
+
+CUTOFF_COLUMNS = {
+    "OC": "OC CUTOFF",
+    "EWS": "EWS CUTOFF",
+    "OBC": "OBC CUTOFF",
+    "SC": "SC CUTOFF",
+    "ST": "ST CUTOFF",
+}
+
+OPTION_COLUMNS = {
+    'College Name_master': 'College Name',
+    'Program_uploaded': 'Program',
+    'TYPE_uploaded': 'Type',
+    'Student Order': 'Student Order',
+}
+
+
+def gap_analysis(merged_data, air, category):
+    cutoff_column = CUTOFF_COLUMNS[category]
+    options = merged_data[list(OPTION_COLUMNS) + [cutoff_column]].rename(columns=OPTION_COLUMNS)
+    options = options.assign(**{
+        'Student Order': pd.to_numeric(options['Student Order'], errors='coerce'),
+        cutoff_column: pd.to_numeric(options[cutoff_column], errors='coerce'),
+    })
+    options = options.sort_values('Student Order', kind='stable', na_position='last').reset_index(drop=True)
+
+    cutoff = options[cutoff_column].to_numpy(dtype=np.float64, na_value=np.nan)
+    margin = cutoff - air
+    has_cutoff = ~np.isnan(cutoff)
+    reachable = has_cutoff & (margin >= 0)
+
+    # Reachable options strictly below each row (reverse cumulative count)
+    reachable_below = np.cumsum(reachable[::-1])[::-1] - reachable
+
+    options['Margin'] = margin
+    options['Reachable'] = reachable
+    options['Reachable Below'] = reachable_below
+    options['Dead'] = has_cutoff & ~reachable & (reachable_below > 0)
+    options['Status'] = np.select(
+        [reachable, options['Dead'].to_numpy(), has_cutoff],
+        ['Reachable', 'Dead', 'Unreachable'],
+        default='No Cutoff'
+    )
+    options.index = range(1, len(options) + 1)
+    return options
+
+
+def gap_summary(options):
+    reachable = options.loc[options['Reachable'], 'Student Order']
+    return {
+        "Options": int(len(options)),
+        "Reachable": int(options['Reachable'].sum()),
+        "Dead": int(options['Dead'].sum()),
+        "No Cutoff": int((options['Status'] == 'No Cutoff').sum()),
+        "First Reachable Order": None if reachable.empty or pd.isna(reachable.iloc[0]) else int(reachable.iloc[0]),
+    }
@@ -0,0 +1,316 @@
+import json
+import os
+import threading
+from datetime import datetime
+
+import pandas as pd
+
+from utils.excel_reader import read_excel
+
+# Versioned, columnar copy of the MASTER EXCEL sheet.
+#
+# Layout under STORE_DIR:
+#   manifest.json      version history (head, per-version counts, touched rows)
+#   v0001.parquet      full snapshot the store was initialised from
+#   v0002.parquet ...  upserted rows for each later version (deletes live in the manifest)
+#   head.parquet       materialised snapshot of the head version
+#
+# Every row carries a stable integer row id (the frame index) so that MAIN CODE
+# duplicates in the source workbook do not break updates, diffs or derived caches.
+
+STORE_DIR = os.path.join("data", "store", "master")
+KEY_COLUMN = "MAIN CODE"
+ACTION_COLUMN = "ACTION"
+ACTIONS = ("ADD", "UPDATE", "DELETE")
+
+_lock = threading.RLock()
+_store = None
+
+
+def arrow_safe(frame):
+    # Parquet columns must hold a single type; mixed object columns become text
+    frame = frame.copy()
+    for column in frame.columns:
+        if frame[column].dtype != object:
+            continue
+        kind = pd.api.types.infer_dtype(frame[column], skipna=True)
+        if kind in ("integer", "floating", "mixed-integer-float"):
+            frame[column] = pd.to_numeric(frame[column])
+        elif kind not in ("string", "empty"):
+            frame[column] = frame[column].map(lambda x: str(x) if pd.notnull(x) else None)
+    return frame
+
+
+class MasterStore:
+    def __init__(self, root=STORE_DIR):
+        self.root = root
+        self._snapshots = {}
+        self._derived = None
+
+    # --- manifest -------------------------------------------------------
+
+    @property
+    def manifest_path(self):
+        return os.path.join(self.root, "manifest.json")
+
+    def exists(self):
+        return os.path.exists(self.manifest_path)
+
+    def _read_manifest(self):
+        with open(self.manifest_path) as f:
+            return json.load(f)
+
+    def _write_manifest(self, manifest):
+        tmp_path = self.manifest_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(tmp_path, self.manifest_path)
+
+    def _version_path(self, version):
+        return os.path.join(self.root, f"v{version:04d}.parquet")
+
+    @property
+    def head(self):
+        return self._read_manifest()["head"] if self.exists() else 0
+
+    def history(self):
+        if not self.exists():
+            return pd.DataFrame(columns=["version", "created", "source", "added", "updated", "deleted", "rows"])
+        versions = self._read_manifest()["versions"]
+        return pd.DataFrame([
+            {k: v for k, v in entry.items() if k not in ("upserted_ids", "deleted_ids")}
+            for entry in versions
+        ])
+
+    # --- writing --------------------------------------------------------
+
+    def initialize(self, master_sheet, source="MASTER EXCEL.xlsx"):
+        if self.exists():
+            raise ValueError(f"Master store already initialised at '{self.root}'.")
+        if KEY_COLUMN not in master_sheet.columns:
+            raise ValueError(f"Master sheet must contain a '{KEY_COLUMN}' column.")
+
+        os.makedirs(self.root, exist_ok=True)
+        snapshot = arrow_safe(master_sheet.reset_index(drop=True))
+        snapshot.index.name = "_row"
+
+        with _lock:
+            snapshot.to_parquet(self._version_path(1))
+            snapshot.to_parquet(os.path.join(self.root, "head.parquet"))
+            self._write_manifest({
+                "head": 1,
+                "next_row": int(len(snapshot)),
+                "versions": [{
+                    "version": 1,
+                    "created": datetime.now().isoformat(timespec="seconds"),
+                    "source": source,
+                    "added": int(len(snapshot)),
+                    "updated": 0,
+                    "deleted": 0,
+                    "rows": int(len(snapshot)),
+                    "upserted_ids": [],
+                    "deleted_ids": [],
+                }],
+            })
+        self._snapshots = {1: snapshot}
+        return 1
+
+    def apply_delta(self, delta, source="delta"):
+        # `delta` is a frame (or workbook path/buffer) keyed by MAIN CODE with an ACTION column.
+        # Returns the new version's manifest entry, or None if the delta changes nothing
+        if not isinstance(delta, pd.DataFrame):
+            sheets = read_excel(delta, sheet_name=None)
+            delta = pd.concat(sheets.values(), ignore_index=True)
+
+        if not {KEY_COLUMN, ACTION_COLUMN}.issubset(delta.columns):
+            raise ValueError(f"Delta must contain '{KEY_COLUMN}' and '{ACTION_COLUMN}' columns.")
+
+        delta = delta.dropna(subset=[KEY_COLUMN]).copy()
+        delta[KEY_COLUMN] = delta[KEY_COLUMN].astype(str).str.strip()
+        delta[ACTION_COLUMN] = delta[ACTION_COLUMN].astype(str).str.strip().str.upper()
+        unknown = set(delta[ACTION_COLUMN]) - set(ACTIONS)
+        if unknown:
+            raise ValueError(f"Unknown delta actions: {', '.join(sorted(unknown))}")
+
+        with _lock:
+            manifest = self._read_manifest()
+            current = self.load(manifest["head"])
+            keys = current[KEY_COLUMN].astype(str)
+
+            adds = delta[delta[ACTION_COLUMN] == "ADD"].drop_duplicates(KEY_COLUMN, keep="last")
+            updates = delta[delta[ACTION_COLUMN] == "UPDATE"].drop_duplicates(KEY_COLUMN, keep="last")
+            deletes = delta[delta[ACTION_COLUMN] == "DELETE"]
+
+            existing = set(keys)
+            for label, frame, should_exist in (("ADD", adds, False), ("UPDATE", updates, True), ("DELETE", deletes, True)):
+                bad = sorted(k for k in frame[KEY_COLUMN] if (k in existing) != should_exist)
+                if bad:
+                    reason = "already exist" if label == "ADD" else "do not exist"
+                    raise ValueError(f"{label} keys {reason} in version {manifest['head']}: {', '.join(bad[:10])}")
+
+            columns = [c for c in current.columns]
+            unknown_columns = [c for c in delta.columns if c != ACTION_COLUMN and c not in columns]
+            if unknown_columns:
+                raise ValueError(f"Delta columns not in the master: {', '.join(map(str, unknown_columns))}")
+
+            # Updates apply to every row sharing the key; only non-empty cells overwrite
+            update_ids = keys.index[keys.isin(updates[KEY_COLUMN])]
+            update_values = (
+                keys.loc[update_ids].rename(KEY_COLUMN).reset_index()
+                .merge(updates.drop(columns=[ACTION_COLUMN]), on=KEY_COLUMN, how="left")
+                .set_index("_row")
+            )
+            updated_rows = update_values.combine_first(current.loc[update_ids])[columns]
+            changed = (updated_rows.astype(object).fillna("<NA>") != current.loc[update_ids, columns].astype(object).fillna("<NA>")).any(axis=1)
+            updated_rows = updated_rows[changed]
+
+            added_rows = adds.drop(columns=[ACTION_COLUMN]).reindex(columns=columns).reset_index(drop=True)
+            added_rows.index = pd.RangeIndex(manifest["next_row"], manifest["next_row"] + len(added_rows), name="_row")
+
+            deleted_ids = keys.index[keys.isin(deletes[KEY_COLUMN])]
+            if updated_rows.empty and added_rows.empty and deleted_ids.empty:
+                # Nothing to record; the head stays as it is
+                return None
+
+            upserts = arrow_safe(pd.concat([updated_rows, added_rows]))
+            upserts.index.name = "_row"
+            snapshot = self._replay(current, upserts, deleted_ids)
+
+            version = manifest["head"] + 1
+            upserts.to_parquet(self._version_path(version))
+            snapshot.to_parquet(os.path.join(self.root, "head.parquet"))
+            entry = {
+                "version": version,
+                "created": datetime.now().isoformat(timespec="seconds"),
+                "source": source,
+                "added": int(len(added_rows)),
+                "updated": int(len(updated_rows)),
+                "deleted": int(len(deleted_ids)),
+                "rows": int(len(snapshot)),
+                "upserted_ids": [int(i) for i in upserts.index],
+                "deleted_ids": [int(i) for i in deleted_ids],
+            }
+            manifest["versions"].append(entry)
+            manifest["head"] = version
+            manifest["next_row"] = manifest["next_row"] + len(added_rows)
+            self._write_manifest(manifest)
+            self._snapshots = {version: snapshot}
+        return entry
+
+    @staticmethod
+    def _replay(snapshot, upserts, deleted_ids):
+        snapshot = snapshot.drop(index=deleted_ids)
+        kept = snapshot.index.difference(upserts.index)
+        merged = pd.concat([snapshot.loc[kept], arrow_safe(upserts)])
+        # Keep the original row order; new rows go to the end
+        order = list(snapshot.index) + [i for i in upserts.index if i not in snapshot.index]
+        merged = arrow_safe(merged.loc[order])
+        merged.index.name = "_row"
+        return merged
+
+    # --- reading --------------------------------------------------------
+
+    def load(self, version=None):
+        with _lock:
+            return self._load(version)
+
+    def _load(self, version):
+        manifest = self._read_manifest()
+        version = manifest["head"] if version is None else version
+        if version < 1 or version > manifest["head"]:
+            raise ValueError(f"Unknown master version {version}.")
+
+        if version in self._snapshots:
+            return self._snapshots[version]
+
+        if version == manifest["head"]:
+            snapshot = pd.read_parquet(os.path.join(self.root, "head.parquet"))
+        else:
+            # Start from the nearest cached version below the target and replay forward
+            cached = [v for v in self._snapshots if v < version]
+            start = max(cached) if cached else 1
+            snapshot = self._snapshots[start] if cached else pd.read_parquet(self._version_path(1))
+            for entry in manifest["versions"][start:version]:
+                upserts = pd.read_parquet(self._version_path(entry["version"]))
+                snapshot = self._replay(snapshot, upserts, entry["deleted_ids"])
+
+        # Keep the head plus the most recently requested version
+        self._snapshots = {v: s for v, s in self._snapshots.items() if v == manifest["head"]}
+        self._snapshots[version] = snapshot
+        return snapshot
+
+    def changed_rows(self, from_version, to_version):
+        # Row ids touched by any version in (from_version, to_version]
+        entries = self._read_manifest()["versions"][from_version:to_version]
+        touched = set()
+        for entry in entries:
+            touched.update(entry["upserted_ids"])
+            touched.update(entry["deleted_ids"])
+        return touched
+
+    def diff(self, from_version, to_version):
+        old = self.load(from_version)
+        new = self.load(to_version)
+        touched = self.changed_rows(min(from_version, to_version), max(from_version, to_version))
+
+        old_ids = old.index.intersection(list(touched))
+        new_ids = new.index.intersection(list(touched))
+
+        added = new.loc[new_ids.difference(old_ids)]
+        deleted = old.loc[old_ids.difference(new_ids)]
+
+        common = old_ids.intersection(new_ids)
+        columns = old.columns.intersection(new.columns)
+        before = old.loc[common, columns].astype(object)
+        after = new.loc[common, columns].astype(object)
+        differs = before.fillna("<NA>") != after.fillna("<NA>")
+        records = []
+        for row_id, column in zip(*differs.values.nonzero()):
+            row = common[row_id]
+            records.append({
+                "_row": row,
+                KEY_COLUMN: new.at[row, KEY_COLUMN],
+                "Column": columns[column],
+                "Old Value": before.iat[row_id, column],
+                "New Value": after.iat[row_id, column],
+            })
+        changed = pd.DataFrame(records, columns=["_row", KEY_COLUMN, "Column", "Old Value", "New Value"])
+
+        return {"added": added, "deleted": deleted, "changed": changed}
+
+    def derived(self, version=None):
+        # Normalised master (see utils.normalize_master), refreshed only for touched rows
+        with _lock:
+            return self._derive(version)
+
+    def _derive(self, version):
+        from utils.utils import normalize_master
+
+        version = self.head if version is None else version
+        snapshot = self.load(version)
+
+        if self._derived is not None and self._derived[0] == version:
+            return self._derived[1]
+
+        if self._derived is not None and self._derived[0] < version:
+            cached_version, frame = self._derived
+            touched = self.changed_rows(cached_version, version)
+            frame = frame.drop(index=frame.index.intersection(list(touched)))
+            refreshed = snapshot.index.intersection(list(touched))
+            if len(refreshed):
+                frame = pd.concat([frame, normalize_master(snapshot.loc[refreshed])])
+            frame = frame.loc[snapshot.index]
+        else:
+            frame = normalize_master(snapshot)
+
+        self._derived = (version, frame)
+        return frame
+
+
+def get_store():
+    # One store per server process so snapshot and derived caches are shared across sessions
+    global _store
+    with _lock:
+        if _store is None:
+            _store = MasterStore()
+        return _store
@@ -0,0 +1,242 @@
+import contextvars
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Process-local telemetry: counters and histograms kept in memory and exposed as
+# Prometheus text on http://127.0.0.1:<METRICS_PORT>/metrics and/or written as
+# JSON to METRICS_FILE every METRICS_INTERVAL seconds.
+#
+#   ETERNALS_METRICS_PORT      port of the scrape endpoint (default 9464, 0 = off)
+#   ETERNALS_METRICS_FILE      JSON snapshot path (unset = off)
+#   ETERNALS_METRICS_INTERVAL  seconds between JSON snapshots (default 15)
+
+logger = logging.getLogger(__name__)
+
+METRICS_PORT = int(os.environ.get("ETERNALS_METRICS_PORT", "9464"))
+METRICS_FILE = os.environ.get("ETERNALS_METRICS_FILE")
+METRICS_INTERVAL = float(os.environ.get("ETERNALS_METRICS_INTERVAL", "15"))
+
+# Seconds; covers cache hits (ms) up to full workbook parses
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+HELP = {
+    "eternals_page_rerun_seconds": "Duration of a script rerun, by page.",
+    "eternals_cache_requests_total": "Cache lookups, by cache and result (hit or miss).",
+    "eternals_rows_processed_total": "Rows read or computed, by source.",
+    "eternals_sql_queries_total": "Queries run by the general analysis query engine.",
+    "eternals_excel_parse_seconds": "Duration of a single Excel sheet parse.",
+    "eternals_process_resident_memory_bytes": "Resident set size of the server process.",
+    "eternals_process_peak_resident_memory_bytes": "Peak resident set size of the server process.",
+}
+
+_lock = threading.Lock()
+_counters = {}
+_histograms = {}
+_missed = contextvars.ContextVar("cache_missed", default=False)
+
+
+def _labels(labels):
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def inc(name, value=1, **labels):
+    key = (name, _labels(labels))
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+
+
+def observe(name, value, buckets=DEFAULT_BUCKETS, **labels):
+    key = (name, _labels(labels))
+    with _lock:
+        histogram = _histograms.get(key)
+        if histogram is None:
+            histogram = _histograms[key] = {"buckets": buckets, "counts": [0] * len(buckets), "sum": 0.0, "count": 0}
+        for i, bound in enumerate(histogram["buckets"]):
+            if value <= bound:
+                histogram["counts"][i] += 1
+        histogram["sum"] += value
+        histogram["count"] += 1
+
+
+@contextmanager
+def timed(name, **labels):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(name, time.perf_counter() - start, **labels)
+
+
+def cache_result(cache, hit):
+    inc("eternals_cache_requests_total", cache=cache, result="hit" if hit else "miss")
+
+
+@contextmanager
+def cache_lookup(cache):
+    # For st.cache_* functions: the cached body calls mark_miss() when it runs
+    token = _missed.set(False)
+    try:
+        yield
+    finally:
+        missed = _missed.get()
+        _missed.reset(token)
+        cache_result(cache, not missed)
+
+
+def mark_miss():
+    _missed.set(True)
+
+
+def rows_processed(source, rows):
+    inc("eternals_rows_processed_total", int(rows), source=source)
+
+
+def _rss_bytes():
+    # Current RSS from /proc on Linux; elsewhere only the peak is known
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def _peak_rss_bytes():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def _gauges():
+    gauges = {}
+    peak = _peak_rss_bytes()
+    if peak is not None:
+        gauges[("eternals_process_peak_resident_memory_bytes", ())] = peak
+    rss = _rss_bytes()
+    if rss is not None:
+        gauges[("eternals_process_resident_memory_bytes", ())] = rss
+    return gauges
+
+
+def _format_labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"') for _, value in pairs)
+    return "{" + ",".join(f'{key}="{value}"' for (key, _), value in zip(pairs, escaped)) + "}"
+
+
+def render_prometheus():
+    with _lock:
+        counters = dict(_counters)
+        histograms = {key: {**h, "counts": list(h["counts"])} for key, h in _histograms.items()}
+
+    lines = []
+    typed = set()
+
+    def header(name, kind):
+        if name not in typed:
+            typed.add(name)
+            if name in HELP:
+                lines.append(f"# HELP {name} {HELP[name]}")
+            lines.append(f"# TYPE {name} {kind}")
+
+    for (name, labels), value in sorted(counters.items()):
+        header(name, "counter")
+        lines.append(f"{name}{_format_labels(labels)} {value}")
+
+    for (name, labels), histogram in sorted(histograms.items()):
+        header(name, "histogram")
+        for bound, count in zip(histogram["buckets"], histogram["counts"]):
+            lines.append(f"{name}_bucket{_format_labels(labels, [('le', str(bound))])} {count}")
+        lines.append(f"{name}_bucket{_format_labels(labels, [('le', '+Inf')])} {histogram['count']}")
+        lines.append(f"{name}_sum{_format_labels(labels)} {histogram['sum']}")
+        lines.append(f"{name}_count{_format_labels(labels)} {histogram['count']}")
+
+    for (name, labels), value in sorted(_gauges().items()):
+        header(name, "gauge")
+        lines.append(f"{name}{_format_labels(labels)} {value}")
+
+    return "\n".join(lines) + "\n"
+
+
+def snapshot():
+    # JSON-friendly view of every metric
+    with _lock:
+        counters = [{"name": name, "labels": dict(labels), "value": value} for (name, labels), value in _counters.items()]
+        histograms = [
+            {"name": name, "labels": dict(labels), "buckets": list(h["buckets"]), "counts": list(h["counts"]),
+             "sum": h["sum"], "count": h["count"]}
+            for (name, labels), h in _histograms.items()
+        ]
+    gauges = [{"name": name, "labels": dict(labels), "value": value} for (name, labels), value in _gauges().items()]
+    return {"timestamp": time.time(), "pid": os.getpid(), "counters": counters, "histograms": histograms, "gauges": gauges}
+
+
+def write_snapshot(path):
+    # Written to a temporary file first so a scraper never reads half a snapshot
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(snapshot(), f)
+    os.replace(tmp_path, path)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] not in ("/metrics", "/"):
+            self.send_error(404)
+            return
+        body = render_prometheus().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def _write_periodically(path, interval):
+    while True:
+        try:
+            write_snapshot(path)
+        except OSError as e:
+            logger.warning("Could not write metrics to %s: %s", path, e)
+        time.sleep(interval)
+
+
+_started = False
+_start_lock = threading.Lock()
+
+
+def start_exporters(port=METRICS_PORT, path=METRICS_FILE, interval=METRICS_INTERVAL):
+    # Idempotent; called on every rerun, starts the exporters once per process
+    global _started
+    with _start_lock:
+        if _started:
+            return
+        _started = True
+
+    if port:
+        try:
+            server = ThreadingHTTPServer(("127.0.0.1", port), _MetricsHandler)
+            server.daemon_threads = True
+            threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+            logger.info("Metrics endpoint on http://127.0.0.1:%d/metrics", port)
+        except OSError as e:
+            logger.warning("Metrics endpoint not started on port %d: %s", port, e)
+
+    if path:
+        threading.Thread(target=_write_periodically, args=(path, interval), name="metrics-file", daemon=True).start()
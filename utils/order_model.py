@@ -0,0 +1,172 @@
+import numpy as np
+import pandas as pd
+
+# Order table kept sorted between reruns.
+#
+# Every master row that has both a program rank and a state rank sits in `order`
+# under the composite key (program rank, state rank, row), packed into one int64.
+# Changing one rank removes that state's (or program's) keys and re-inserts them
+# with the new rank; only the slice between the old and new positions is
+# re-sorted and renumbered. Rows without a State (factorize code -1) are never
+# ranked. Ties keep master row order.
+#
+# Only the order itself is updated incrementally. sync() still compares every
+# state and program rank, and ordered_frame() gathers all ordered rows from the
+# master; both are linear in their input.
+
+
+class OrderModel:
+    def __init__(self, master_sheet):
+        self.n_rows = len(master_sheet)
+        self.state_codes, self.states = pd.factorize(master_sheet['State'])
+        program_keys = master_sheet['Program'].astype(str) + "_" + master_sheet['TYPE'].astype(str)
+        self.program_codes, self.programs = pd.factorize(program_keys)
+
+        # Ranks are bounded by the number of states / programs (as in the selectboxes)
+        self.state_bound = len(self.states) + 1
+        self.program_bound = len(self.programs) + 1
+
+        self.state_ranks = np.zeros(len(self.states), dtype=np.int64)
+        self.program_ranks = np.zeros(len(self.programs), dtype=np.int64)
+
+        self._state_index = {state: code for code, state in enumerate(self.states)}
+        self._program_index = {program: code for code, program in enumerate(self.programs)}
+        self._rows_by_state = self._group_rows(self.state_codes, len(self.states))
+        self._rows_by_program = self._group_rows(self.program_codes, len(self.programs))
+
+        self.order = np.empty(0, dtype=np.int64)
+        self.order_numbers = np.zeros(self.n_rows, dtype=np.int64)
+
+    @staticmethod
+    def _group_rows(codes, n_groups):
+        rows = np.argsort(codes, kind="stable")
+        bounds = np.searchsorted(codes[rows], np.arange(n_groups + 1))
+        return [rows[bounds[i]:bounds[i + 1]] for i in range(n_groups)]
+
+    @staticmethod
+    def _ranks_at(ranks, codes):
+        # Code -1 (missing name) reads as unranked rather than as the last entry
+        values = np.zeros(len(codes), dtype=np.int64)
+        known = codes >= 0
+        values[known] = ranks[codes[known]]
+        return values
+
+    def row_ranks(self, state_ranks, program_ranks, rows):
+        # (state rank, program rank) of each row
+        return (
+            self._ranks_at(state_ranks, self.state_codes[rows]),
+            self._ranks_at(program_ranks, self.program_codes[rows]),
+        )
+
+    def _keys(self, rows):
+        state_rank, program_rank = self.row_ranks(self.state_ranks, self.program_ranks, rows)
+        ranked = (program_rank > 0) & (state_rank > 0)
+        keys = (program_rank * self.state_bound + state_rank) * self.n_rows + rows
+        return np.sort(keys[ranked])
+
+    def _replace(self, old_keys, new_keys):
+        if len(old_keys) == 0 and len(new_keys) == 0:
+            return
+
+        if len(old_keys) == len(new_keys):
+            # Same block size: only the range spanned by the old and new keys shifts
+            lo = min(np.searchsorted(self.order, old_keys[0]), np.searchsorted(self.order, new_keys[0]))
+            hi = max(np.searchsorted(self.order, old_keys[-1], side="right"), np.searchsorted(self.order, new_keys[-1], side="right"))
+            segment = self.order[lo:hi]
+            segment = np.sort(np.concatenate([segment[~np.isin(segment, old_keys)], new_keys]))
+            self.order[lo:hi] = segment
+            self.order_numbers[segment % self.n_rows] = np.arange(lo + 1, hi + 1)
+            return
+
+        # Rows enter or leave the order: everything after the first change is renumbered
+        self.order_numbers[old_keys % self.n_rows] = 0
+        remaining = np.delete(self.order, np.searchsorted(self.order, old_keys))
+        self.order = np.insert(remaining, np.searchsorted(remaining, new_keys), new_keys)
+        first = min(
+            np.searchsorted(self.order, old_keys[0]) if len(old_keys) else len(self.order),
+            np.searchsorted(self.order, new_keys[0]) if len(new_keys) else len(self.order),
+        )
+        tail = self.order[first:]
+        self.order_numbers[tail % self.n_rows] = np.arange(first + 1, first + len(tail) + 1)
+
+    def _check_rank(self, rank, bound, label):
+        if not 0 <= rank < bound:
+            raise ValueError(f"{label} rank {rank} is outside 0..{bound - 1}.")
+
+    def set_state_rank(self, state, rank):
+        code = self._state_index[state]
+        rank = int(rank)
+        self._check_rank(rank, self.state_bound, "State")
+        if self.state_ranks[code] == rank:
+            return False
+        rows = self._rows_by_state[code]
+        old_keys = self._keys(rows)
+        self.state_ranks[code] = rank
+        self._replace(old_keys, self._keys(rows))
+        return True
+
+    def set_program_rank(self, program_key, rank):
+        # `program_key` is "<Program>_<TYPE>", as used by the ranking widgets
+        code = self._program_index[program_key]
+        rank = int(rank)
+        self._check_rank(rank, self.program_bound, "Program")
+        if self.program_ranks[code] == rank:
+            return False
+        rows = self._rows_by_program[code]
+        old_keys = self._keys(rows)
+        self.program_ranks[code] = rank
+        self._replace(old_keys, self._keys(rows))
+        return True
+
+    def sync(self, state_ranking, program_ranking):
+        # Apply only the ranks that differ from the last sync; returns the number changed
+        state_ranks, program_ranks = self.rank_arrays(state_ranking, program_ranking)
+        changed = 0
+        for code in np.flatnonzero(state_ranks != self.state_ranks):
+            changed += self.set_state_rank(self.states[code], state_ranks[code])
+        for code in np.flatnonzero(program_ranks != self.program_ranks):
+            changed += self.set_program_rank(self.programs[code], program_ranks[code])
+        return changed
+
+    def rank_arrays(self, state_ranking, program_ranking):
+        # Rank per state / program code for a {name: rank} pair; unknown names are ignored
+        state_ranks = np.zeros(len(self.states), dtype=np.int64)
+        program_ranks = np.zeros(len(self.programs), dtype=np.int64)
+        for state, rank in state_ranking.items():
+            if state in self._state_index:
+                state_ranks[self._state_index[state]] = rank
+        for program_key, rank in program_ranking.items():
+            if program_key in self._program_index:
+                program_ranks[self._program_index[program_key]] = rank
+        return state_ranks, program_ranks
+
+    def ordered_rows(self, state_ranks, program_ranks):
+        # One-off order for other rankings (e.g. saved profiles); the model is not changed
+        state_rank, program_rank = self.row_ranks(state_ranks, program_ranks, np.arange(self.n_rows))
+        rows = np.flatnonzero((program_rank > 0) & (state_rank > 0))
+        return rows[np.lexsort((rows, state_rank[rows], program_rank[rows]))]
+
+    def ordered_frame(self, master_sheet):
+        # `master_sheet` must have the same rows, in the same order, as the model
+        rows = self.order % self.n_rows
+        ordered_data = master_sheet.iloc[rows].reset_index(drop=True)
+        ordered_data['State Rank'], ordered_data['Program Rank'] = self.row_ranks(self.state_ranks, self.program_ranks, rows)
+        ordered_data['Order Number'] = np.arange(1, len(rows) + 1)
+        return ordered_data
+
+
+def order_summary_sheets(ordered_data, columns=None):
+    # Export bundle: the ordered table plus per-state and per-program summaries
+    def summary(keys, rank):
+        return ordered_data.groupby(keys, sort=False).agg(**{
+            rank: (rank, 'first'),
+            'Options': ('Order Number', 'count'),
+            'First Order': ('Order Number', 'min'),
+            'Last Order': ('Order Number', 'max'),
+        }).reset_index().sort_values(rank, kind='stable')
+
+    return [
+        ("Ordered Table", ordered_data[columns] if columns else ordered_data),
+        ("State Summary", summary(['State'], 'State Rank')),
+        ("Program Summary", summary(['Program', 'TYPE'], 'Program Rank')),
+    ]
@@ -0,0 +1,101 @@
+import logging
+import threading
+import time
+
+# Startup prewarm: the first rerun of the app starts one background thread per
+# server process that builds the shared master and allotment artifacts (see
+# utils.shared_frames and utils.cutoff_data). Pages call the same cached
+# accessors, so they pick up whatever is already warm, wait for an item the
+# thread is still computing, and compute the rest themselves. Progress is shown
+# in the sidebar by show_prewarm_status().
+
+logger = logging.getLogger(__name__)
+
+_status = {}
+_lock = threading.Lock()
+_thread = None
+
+
+def _steps():
+    from utils.allotment_store import AllotmentStore
+    from utils.shared_frames import master_view, master_text_view, normalized_master_view
+    from utils.cutoff_data import cutoff_data, cutoff_pivot, remarks_matrix, eligibility_engine, cutoff_value_sets
+    from utils.utils import master_columns
+
+    def default_selection():
+        # Same defaults as the cutoff page: latest year, its latest round
+        store = AllotmentStore()
+        store.ensure_seeded()
+        partitions = store.partitions()
+        year = int(partitions['year'].max())
+        round_no = int(partitions.loc[partitions['year'] == year, 'round'].max())
+        return (year,), (round_no,)
+
+    def cutoff_pivots():
+        years, rounds = default_selection()
+        for quota in cutoff_data(years, rounds)['Allotted Quota'].unique():
+            cutoff_pivot(years, rounds, quota)
+
+    return [
+        ("Master data", master_view),
+        ("MAIN CODE keys", master_text_view),
+        ("Normalised master", lambda: normalized_master_view(master_columns())),
+        ("AIQ allotments", lambda: cutoff_data(*default_selection())),
+        ("Cutoff pivots", cutoff_pivots),
+        ("Remarks matrix", lambda: remarks_matrix(*default_selection())),
+        ("Eligibility engine", lambda: eligibility_engine(*default_selection())),
+        ("Typed allotments", lambda: cutoff_value_sets(*default_selection())),
+    ]
+
+
+def _set(name, state, seconds=None, error=None):
+    with _lock:
+        _status[name] = {"state": state, "seconds": seconds, "error": error}
+
+
+def _run(steps):
+    for name, step in steps:
+        _set(name, "running")
+        start = time.perf_counter()
+        try:
+            step()
+            _set(name, "ready", time.perf_counter() - start)
+        except Exception as e:
+            # A failed step only means the page computes it on demand
+            logger.warning("Prewarm step '%s' failed: %s", name, e)
+            _set(name, "failed", time.perf_counter() - start, str(e))
+
+
+def start_prewarm():
+    # Idempotent; called on every rerun, starts the thread once per process
+    global _thread
+    with _lock:
+        if _thread is not None:
+            return
+        steps = _steps()
+        for name, _ in steps:
+            _status[name] = {"state": "pending", "seconds": None, "error": None}
+        # No script run context: the thread outlives the session that started it
+        _thread = threading.Thread(target=_run, args=(steps,), name="prewarm", daemon=True)
+    _thread.start()
+
+
+def prewarm_status():
+    with _lock:
+        return {name: dict(status) for name, status in _status.items()}
+
+
+def show_prewarm_status():
+    import streamlit as st
+
+    status = prewarm_status()
+    if not status:
+        return
+    ready = sum(s["state"] in ("ready", "failed") for s in status.values())
+    if ready == len(status):
+        failed = [name for name, s in status.items() if s["state"] == "failed"]
+        st.sidebar.caption("Data ready" + (f" ({', '.join(failed)} loads on demand)" if failed else ""))
+        return
+
+    running = next((name for name, s in status.items() if s["state"] == "running"), None)
+    st.sidebar.progress(ready / len(status), text=f"Warming up: {running or 'starting'} ({ready}/{len(status)})")
@@ -0,0 +1,281 @@
+import glob
+import hashlib
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+from utils import metrics
+
+# Query sources behind the general analysis Filter, Pivot and Frequency widgets.
+#
+# The widgets describe what they want (filters as {column: selected values},
+# pivot rows/columns/values, grouping columns); a source turns that into a query.
+# With DuckDB installed the query is SQL run by an embedded engine that uses every
+# core and spills to TEMP_DIR once MEMORY_LIMIT is reached, so the parquet
+# allotment history is scanned from disk instead of being loaded into memory.
+# Without DuckDB the same calls run in pandas on a materialised frame.
+#
+#   ETERNALS_DUCKDB_MEMORY   DuckDB memory limit before spilling (default 2GB)
+#   ETERNALS_DUCKDB_THREADS  worker threads (default: all cores)
+
+try:
+    import duckdb
+    SQL_ENGINE = "duckdb"
+except ImportError:
+    duckdb = None
+    SQL_ENGINE = None
+
+TEMP_DIR = os.path.join("data", "store", "duckdb_tmp")
+MEMORY_LIMIT = os.environ.get("ETERNALS_DUCKDB_MEMORY", "2GB")
+THREADS = int(os.environ.get("ETERNALS_DUCKDB_THREADS", os.cpu_count() or 1))
+
+# Columns with at most this many distinct values get a filter widget
+MAX_FILTER_VALUES = 50
+PREVIEW_ROWS = 1000
+
+AGGREGATES = {"sum": "SUM", "mean": "AVG", "max": "MAX", "min": "MIN", "count": "COUNT"}
+
+
+def quote(name):
+    return '"' + str(name).replace('"', '""') + '"'
+
+
+def _interval(start, bin_size):
+    return pd.Interval(start, start + bin_size, closed="left")
+
+
+def _percentages(grouped_data):
+    grouped_data['Percentage'] = (grouped_data['Count'] / grouped_data['Count'].sum() * 100).round(2).astype(str) + '%'
+    return grouped_data
+
+
+class PandasSource:
+    # Fallback: every query runs on the materialised frame
+    engine = "pandas"
+
+    def __init__(self, frame, key):
+        self.data = frame
+        self.key = key
+        self._filter_options = None
+
+    @property
+    def columns(self):
+        return self.data.columns.tolist()
+
+    @property
+    def numeric_columns(self):
+        return self.data.select_dtypes(include=['number']).columns.tolist()
+
+    def row_count(self, filters=None):
+        return int(self._mask(filters).sum())
+
+    def preview(self, limit=None):
+        return self.data if limit is None else self.data.head(limit)
+
+    def filter_options(self, max_values=MAX_FILTER_VALUES):
+        if self._filter_options is None:
+            options = {}
+            for col in self.columns:
+                unique_values = self.data[col].unique()
+                if len(unique_values) <= max_values:
+                    options[col] = unique_values
+            self._filter_options = options
+        return self._filter_options
+
+    def _mask(self, filters):
+        mask = np.ones(len(self.data), dtype=bool)
+        for col, selected_values in (filters or {}).items():
+            mask &= self.data[col].isin(selected_values).to_numpy()
+        return mask
+
+    def filter_key(self, filters):
+        from utils.charts import mask_hash
+        return mask_hash(self._mask(filters))
+
+    def frame(self, columns=None, filters=None):
+        data = self.data if columns is None else self.data[list(dict.fromkeys(columns))]
+        return data[self._mask(filters)] if filters else data
+
+    def pivot(self, rows, columns, values, aggfunc, filters=None):
+        return pd.pivot_table(
+            self.frame(filters=filters),
+            values=values,
+            index=rows,
+            columns=columns if columns else None,
+            aggfunc=aggfunc,
+            fill_value=0
+        )
+
+    def frequency(self, group_columns, bin_size, filters=None):
+        data = self.frame(filters=filters)
+        binned_data = data.copy()
+        for col in group_columns:
+            if pd.api.types.is_numeric_dtype(data[col]):
+                binned_data[col] = pd.cut(
+                    data[col],
+                    bins=range(int(data[col].min()), int(data[col].max()) + bin_size, bin_size),
+                    right=False
+                )
+        grouped_data = binned_data.groupby(group_columns).size().reset_index(name='Count')
+        return _percentages(grouped_data)
+
+
+class DuckDBSource:
+    # SQL over a registered frame or a parquet dataset, exposed as the view `src`
+    engine = "duckdb"
+
+    def __init__(self, key, frame=None, parquet=None):
+        os.makedirs(TEMP_DIR, exist_ok=True)
+        self.key = key
+        self._filter_options = None
+        self._lock = threading.Lock()
+        self._connection = duckdb.connect(config={
+            "temp_directory": TEMP_DIR,
+            "memory_limit": MEMORY_LIMIT,
+            "threads": THREADS,
+        })
+        self._frame = frame
+        if frame is not None:
+            self._connection.register("src", frame)
+        else:
+            self._connection.execute(f"CREATE VIEW src AS {parquet}")
+        schema = self._connection.execute("DESCRIBE src").fetchall()
+        self._types = {name: column_type for name, column_type, *_ in schema}
+
+    def _query(self, sql, params=()):
+        # A cursor per query: the connection is shared by every session
+        metrics.inc("eternals_sql_queries_total", engine=self.engine)
+        with self._lock:
+            cursor = self._connection.cursor()
+        if self._frame is not None:
+            # Registered frames are scanned in place, but only per connection
+            cursor.register("src", self._frame)
+        try:
+            return cursor.execute(sql, list(params)).df()
+        finally:
+            cursor.close()
+
+    @property
+    def columns(self):
+        return list(self._types)
+
+    @property
+    def numeric_columns(self):
+        numeric = ("TINYINT", "SMALLINT", "INTEGER", "BIGINT", "HUGEINT", "UTINYINT", "USMALLINT", "UINTEGER",
+                   "UBIGINT", "FLOAT", "REAL", "DOUBLE")
+        return [name for name, column_type in self._types.items() if column_type.startswith(numeric + ("DECIMAL",))]
+
+    def _where(self, filters, not_null=()):
+        clauses, params = [], []
+        for col, selected_values in (filters or {}).items():
+            values = [v for v in selected_values if not pd.isna(v)]
+            clause = []
+            if values:
+                clause.append(f"{quote(col)} IN ({', '.join('?' * len(values))})")
+                params.extend(v.item() if isinstance(v, np.generic) else v for v in values)
+            if len(values) < len(selected_values):
+                clause.append(f"{quote(col)} IS NULL")
+            clauses.append("(" + " OR ".join(clause) + ")" if clause else "FALSE")
+        clauses.extend(f"{quote(col)} IS NOT NULL" for col in not_null)
+        return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+    def row_count(self, filters=None):
+        where, params = self._where(filters)
+        return int(self._query(f"SELECT COUNT(*) AS n FROM src{where}", params)["n"].iloc[0])
+
+    def preview(self, limit=PREVIEW_ROWS):
+        return self._query(f"SELECT * FROM src LIMIT {int(limit)}")
+
+    def filter_options(self, max_values=MAX_FILTER_VALUES):
+        # One pass for the distinct counts, then the values of the small columns
+        if self._filter_options is not None:
+            return self._filter_options
+        counts = self._query("SELECT " + ", ".join(
+            f"COUNT(DISTINCT {quote(col)}) + MAX(CASE WHEN {quote(col)} IS NULL THEN 1 ELSE 0 END) AS {quote(col)}"
+            for col in self.columns
+        ) + " FROM src").iloc[0]
+        options = {}
+        for col in self.columns:
+            if counts[col] <= max_values:
+                values = self._query(f"SELECT DISTINCT {quote(col)} AS v FROM src ORDER BY v NULLS LAST")["v"]
+                options[col] = values.to_numpy()
+        self._filter_options = options
+        return options
+
+    def filter_key(self, filters):
+        where, params = self._where(filters)
+        return hashlib.sha256(repr((where, params)).encode()).hexdigest()
+
+    def frame(self, columns=None, filters=None):
+        selected = "*" if columns is None else ", ".join(quote(c) for c in dict.fromkeys(columns))
+        where, params = self._where(filters)
+        return self._query(f"SELECT {selected} FROM src{where}", params)
+
+    def pivot(self, rows, columns, values, aggfunc, filters=None):
+        # Aggregate in SQL; only the (small) grouped result is reshaped in pandas
+        keys = list(dict.fromkeys(list(rows) + list(columns or [])))
+        where, params = self._where(filters, not_null=keys)
+        aggregates = ", ".join(f"{AGGREGATES[aggfunc]}({quote(v)}) AS {quote(v)}" for v in values)
+        group_by = ", ".join(quote(k) for k in keys)
+        grouped = self._query(
+            f"SELECT {group_by}, {aggregates} FROM src{where} GROUP BY {group_by} ORDER BY {group_by}", params
+        )
+        if columns:
+            pivot_table = grouped.pivot(index=rows, columns=columns, values=values).fillna(0)
+        else:
+            pivot_table = grouped.set_index(rows)[values]
+        return pivot_table.sort_index()
+
+    def frequency(self, group_columns, bin_size, filters=None):
+        numeric = [col for col in group_columns if col in self.numeric_columns]
+        starts = {}
+        if numeric:
+            where, params = self._where(filters)
+            lows = self._query("SELECT " + ", ".join(f"MIN({quote(c)}) AS {quote(c)}" for c in numeric) + f" FROM src{where}", params)
+            starts = {col: int(lows[col].iloc[0]) for col in numeric if pd.notnull(lows[col].iloc[0])}
+
+        # Numeric columns are bucketed into [start + k*bin, start + (k+1)*bin), as pd.cut(right=False)
+        expressions = []
+        for col in group_columns:
+            if col in starts:
+                expressions.append(
+                    f"CAST({starts[col]} + FLOOR(({quote(col)} - {starts[col]}) / {int(bin_size)}) * {int(bin_size)} AS BIGINT) AS {quote(col)}"
+                )
+            else:
+                expressions.append(quote(col))
+        where, params = self._where(filters, not_null=group_columns)
+        lower_bounds = [f"{quote(col)} >= {starts[col]}" for col in starts]
+        if lower_bounds:
+            where = (where + " AND " if where else " WHERE ") + " AND ".join(lower_bounds)
+        # Positional GROUP BY: the binned expressions reuse the column names
+        group_by = ", ".join(str(i + 1) for i in range(len(group_columns)))
+        grouped_data = self._query(
+            f"SELECT {', '.join(expressions)}, COUNT(*) AS Count FROM src{where} GROUP BY {group_by} ORDER BY {group_by}", params
+        )
+        for col in starts:
+            grouped_data[col] = [_interval(int(start), int(bin_size)) for start in grouped_data[col]]
+        return _percentages(grouped_data)
+
+
+def allotment_parquet_sql(root):
+    # Hive-partitioned allotment store, with the columns AllotmentStore.load returns
+    pattern = os.path.join(root, "**", "*.parquet").replace("'", "''")
+    return (
+        f"SELECT * EXCLUDE (year, round, quota), CAST(year AS INTEGER) AS \"Year\", CAST(round AS INTEGER) AS \"Round\" "
+        f"FROM read_parquet('{pattern}', hive_partitioning = true)"
+    )
+
+
+def frame_source(frame, key):
+    if SQL_ENGINE:
+        return DuckDBSource(key, frame=frame)
+    return PandasSource(frame, key)
+
+
+def allotment_source(key):
+    from utils.allotment_store import AllotmentStore, STORE_DIR
+    if SQL_ENGINE and glob.glob(os.path.join(STORE_DIR, "**", "*.parquet"), recursive=True):
+        return DuckDBSource(key, parquet=allotment_parquet_sql(STORE_DIR))
+    return PandasSource(AllotmentStore().load(), key)
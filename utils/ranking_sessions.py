@@ -0,0 +1,225 @@
+import hashlib
+import io
+import json
+import os
+import re
+import zipfile
+import threading
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from utils.batch_comparison import MAX_BATCH_BYTES, MAX_BATCH_FILES
+
+# Saved ranking sessions (student profiles).
+#
+# A session is one small .npz file under SESSIONS_DIR holding the ranked state
+# and program codes with their ranks:
+#
+#   states         str[]   normalised State names          state_ranks    int32[]
+#   programs       str[]   "<PROGRAM>_<TYPE>" keys          program_ranks  int32[]
+#   meta           str     JSON (name, saved_at, states, programs counts)
+#
+# Only ranked entries are stored, so a session is a few KB and loads without
+# touching Excel. Codes are mapped back onto the current master by name. File
+# names carry a hash of the session name, so names that sanitise alike ("a b",
+# "a_b") never share a file; the name itself lives in the metadata, which is
+# cached per file modification time for listings.
+
+SESSIONS_DIR = os.path.join("data", "store", "sessions")
+EXTENSION = ".npz"
+# A session is a few KB; the arrays inside an .npz may not expand past this
+MAX_SESSION_BYTES = 16 * 1024 * 1024
+
+_meta_cache = {}
+_meta_lock = threading.Lock()
+
+
+def session_file_name(name):
+    name = name.strip()
+    safe = re.sub(r"[^A-Za-z0-9._-]+", "_", name).strip("._")
+    if not safe:
+        raise ValueError("Session name must contain letters or digits.")
+    return f"{safe[:40]}-{hashlib.sha256(name.encode()).hexdigest()[:12]}{EXTENSION}"
+
+
+def _ranked(ranking):
+    items = [(key, int(rank)) for key, rank in ranking.items() if int(rank) > 0]
+    keys = np.array([key for key, _ in items], dtype=str)
+    ranks = np.array([rank for _, rank in items], dtype=np.int32)
+    return keys, ranks
+
+
+def encode_session(name, state_ranking, program_ranking):
+    states, state_ranks = _ranked(state_ranking)
+    programs, program_ranks = _ranked(program_ranking)
+    meta = json.dumps({
+        "name": name.strip(),
+        "saved_at": datetime.now().isoformat(timespec="seconds"),
+        "states": len(states),
+        "programs": len(programs),
+    })
+    buffer = io.BytesIO()
+    np.savez_compressed(
+        buffer,
+        states=states, state_ranks=state_ranks,
+        programs=programs, program_ranks=program_ranks,
+        meta=np.array(meta),
+    )
+    return buffer.getvalue()
+
+
+def decode_session(content):
+    # Returns (meta, state_ranking, program_ranking)
+    try:
+        with zipfile.ZipFile(io.BytesIO(content)) as archive:
+            if sum(info.file_size for info in archive.infolist()) > MAX_SESSION_BYTES:
+                raise ValueError("arrays are too large for a ranking session")
+        with np.load(io.BytesIO(content), allow_pickle=False) as arrays:
+            meta = json.loads(str(arrays["meta"]))
+            state_ranking = dict(zip(arrays["states"].tolist(), arrays["state_ranks"].tolist()))
+            program_ranking = dict(zip(arrays["programs"].tolist(), arrays["program_ranks"].tolist()))
+    except (KeyError, ValueError, OSError, zipfile.BadZipFile) as e:
+        raise ValueError(f"Not a ranking session file ({e}).") from e
+    return meta, state_ranking, program_ranking
+
+
+def read_meta(path):
+    # Session metadata only (the rank arrays are not decompressed), cached per file version
+    stat = os.stat(path)
+    version = (stat.st_mtime_ns, stat.st_size)
+    with _meta_lock:
+        cached = _meta_cache.get(path)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+    try:
+        with np.load(path, allow_pickle=False) as arrays:
+            meta = json.loads(str(arrays["meta"]))
+    except (KeyError, ValueError, OSError, zipfile.BadZipFile) as e:
+        raise ValueError(f"Not a ranking session file ({e}).") from e
+    with _meta_lock:
+        _meta_cache[path] = (version, meta)
+    return meta
+
+
+class SessionStore:
+    def __init__(self, root=SESSIONS_DIR):
+        self.root = root
+
+    def _path(self, name):
+        return os.path.join(self.root, session_file_name(name))
+
+    def save(self, name, state_ranking, program_ranking):
+        content = encode_session(name, state_ranking, program_ranking)
+        os.makedirs(self.root, exist_ok=True)
+        path = self._path(name)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+        return path
+
+    def _entries(self):
+        # {session name: path}; unreadable files are skipped
+        if not os.path.isdir(self.root):
+            return {}
+        entries = {}
+        for file_name in sorted(os.listdir(self.root)):
+            if not file_name.endswith(EXTENSION):
+                continue
+            path = os.path.join(self.root, file_name)
+            try:
+                entries[read_meta(path).get("name", file_name[:-len(EXTENSION)])] = path
+            except (ValueError, OSError):
+                continue
+        return entries
+
+    def load(self, name):
+        path = self._entries().get(name)
+        if path is None:
+            raise ValueError(f"No saved session named '{name}'.")
+        with open(path, "rb") as f:
+            return decode_session(f.read())
+
+    def delete(self, name):
+        path = self._entries().get(name)
+        if path is not None:
+            os.remove(path)
+            with _meta_lock:
+                _meta_cache.pop(path, None)
+
+    def names(self):
+        return sorted(self._entries())
+
+    def list(self):
+        records = []
+        for name, path in sorted(self._entries().items()):
+            meta = read_meta(path)
+            records.append({
+                "Name": name,
+                "States Ranked": meta.get("states"),
+                "Programs Ranked": meta.get("programs"),
+                "Saved": meta.get("saved_at"),
+            })
+        return pd.DataFrame(records, columns=["Name", "States Ranked", "Programs Ranked", "Saved"])
+
+    def load_many(self, names):
+        # {session: (state_ranking, program_ranking)}
+        profiles = {}
+        for name in names:
+            _, state_ranking, program_ranking = self.load(name)
+            profiles[name] = (state_ranking, program_ranking)
+        return profiles
+
+
+def profiles_from_zip(zip_file):
+    # Bulk import: every .npz in the archive is one profile. Same limits as batch
+    # comparison, checked on the declared sizes before a member is decompressed
+    profiles = {}
+    try:
+        archive = zipfile.ZipFile(zip_file)
+    except zipfile.BadZipFile as e:
+        raise ValueError(f"Not a zip archive ({e}).") from e
+    with archive:
+        members = [
+            info for info in archive.infolist()
+            if not info.is_dir()
+            and os.path.basename(info.filename).endswith(EXTENSION)
+            and not os.path.basename(info.filename).startswith("._")
+        ]
+        if len(members) > MAX_BATCH_FILES:
+            raise ValueError(f"Too many profiles (more than {MAX_BATCH_FILES}).")
+        total_bytes = 0
+        for info in members:
+            total_bytes += info.file_size
+            if total_bytes > MAX_BATCH_BYTES:
+                raise ValueError(f"Profiles exceed {MAX_BATCH_BYTES // (1024 * 1024)} MB uncompressed.")
+            try:
+                _, state_ranking, program_ranking = decode_session(archive.read(info))
+            except ValueError as e:
+                raise ValueError(f"{info.filename}: {e}") from e
+            profiles[info.filename[:-len(EXTENSION)]] = (state_ranking, program_ranking)
+    return profiles
+
+
+def bulk_orders(model, master_sheet, profiles, columns=None):
+    # One long table of every profile's order plus a per-profile summary
+    frames, summary = [], []
+    for name, (state_ranking, program_ranking) in profiles.items():
+        state_ranks, program_ranks = model.rank_arrays(state_ranking, program_ranking)
+        rows = model.ordered_rows(state_ranks, program_ranks)
+        ordered_data = master_sheet.iloc[rows] if columns is None else master_sheet.iloc[rows][columns]
+        ordered_data = ordered_data.reset_index(drop=True)
+        ordered_data['State Rank'], ordered_data['Program Rank'] = model.row_ranks(state_ranks, program_ranks, rows)
+        ordered_data['Order Number'] = np.arange(1, len(rows) + 1)
+        ordered_data.insert(0, 'Profile', name)
+        frames.append(ordered_data)
+        summary.append({
+            "Profile": name,
+            "States Ranked": len(state_ranking),
+            "Programs Ranked": len(program_ranking),
+            "Options": len(rows),
+        })
+    orders = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+    return pd.DataFrame(summary, columns=["Profile", "States Ranked", "Programs Ranked", "Options"]), orders
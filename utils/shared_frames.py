@@ -0,0 +1,192 @@
+import os
+import threading
+
+import pandas as pd
+import streamlit as st
+
+from utils import metrics
+from utils.cache import ByteLRUCache
+
+# Process-wide, read-only master and allotment frames.
+#
+# The frames live once per server process (st.cache_resource, no pickling) and
+# callers only ever receive copy-on-write views of them, so a page assigning a
+# column or an index touches its own view and never the shared data. Per-session
+# derived columns go into a FrameOverlay; identical derived results (e.g. the same
+# ranking upload in two sessions) are shared through `shared_derived`.
+#
+# The views rely on pandas 3, where copy-on-write is always on (requirements.txt
+# pins pandas>=3.0.0).
+
+MAX_DERIVED_BYTES = 256 * 1024 * 1024
+
+_derived = ByteLRUCache(MAX_DERIVED_BYTES)
+_computing = {}
+_computing_lock = threading.Lock()
+_allotments_generation = 0
+
+
+class SharedFrame:
+    # Immutable frame; view() hands out cheap copy-on-write views
+
+    def __init__(self, frame):
+        self._frame = frame
+
+    def __len__(self):
+        return len(self._frame)
+
+    @property
+    def columns(self):
+        return self._frame.columns.tolist()
+
+    def view(self, columns=None):
+        frame = self._frame if columns is None else self._frame[list(columns)]
+        return frame.copy(deep=False)
+
+
+class SharedColumns:
+    # Shared frame whose columns are loaded on first use and then kept.
+    # `always` columns come with every view (the loader returns them anyway).
+
+    def __init__(self, loader, always=()):
+        self._loader = loader
+        self._always = list(always)
+        self._columns = {}
+        self._index = None
+        self._lock = threading.Lock()
+
+    def view(self, columns):
+        with self._lock:
+            missing = [c for c in columns if c not in self._columns]
+            if missing or self._index is None:
+                metrics.mark_miss()
+                loaded = self._loader(missing or list(columns))
+                for column in loaded.columns:
+                    self._columns.setdefault(column, loaded[column])
+                self._index = loaded.index
+            wanted = [c for c in dict.fromkeys(list(columns) + self._always) if c in self._columns]
+            return pd.DataFrame({c: self._columns[c] for c in wanted}, index=self._index, copy=False)
+
+
+class FrameOverlay:
+    # A shared view plus per-session derived columns, materialised on demand
+
+    def __init__(self, base, derived=None):
+        self.base = base
+        self.derived = dict(derived or {})
+
+    @property
+    def columns(self):
+        return list(dict.fromkeys(self.base.columns.tolist() + list(self.derived)))
+
+    def with_columns(self, **columns):
+        return FrameOverlay(self.base, {**self.derived, **columns})
+
+    def to_frame(self, columns=None):
+        frame = self.base.copy(deep=False)
+        for name, values in self.derived.items():
+            frame[name] = values
+        return frame if columns is None else frame[list(columns)]
+
+
+def shared_derived(key, compute, cache="derived"):
+    # One copy of each distinct derived result per process; `cache` labels the metrics.
+    # Concurrent callers of a key being computed (e.g. by the prewarm) wait for it
+    value = _derived.get(key)
+    if value is not None:
+        metrics.cache_result(cache, hit=True)
+        return value
+
+    with _computing_lock:
+        key_lock = _computing.setdefault(key, threading.Lock())
+    with key_lock:
+        value = _derived.get(key)
+        metrics.cache_result(cache, hit=value is not None)
+        if value is None:
+            try:
+                value = compute()
+                _derived.put(key, value)
+            finally:
+                with _computing_lock:
+                    _computing.pop(key, None)
+    return value
+
+
+def master_signature():
+    # Changes whenever the master data changes (new store version or edited workbook)
+    from utils.master_store import get_store
+    from utils.utils import MASTER_FILE
+    store = get_store()
+    if store.exists():
+        return ("store", store.head)
+    if os.path.exists(MASTER_FILE):
+        return ("file", os.path.getmtime(MASTER_FILE))
+    return ("missing", None)
+
+
+@st.cache_resource(max_entries=4, show_spinner=False)
+def _master(signature):
+    from utils.utils import read_master_sheet
+    metrics.mark_miss()
+    return SharedFrame(read_master_sheet())
+
+
+@st.cache_resource(max_entries=4, show_spinner=False)
+def _master_text(signature):
+    from utils.utils import read_master_sheet, master_as_text
+    from utils.batch_comparison import main_code
+    metrics.mark_miss()
+    master_sheet = master_as_text(read_master_sheet())
+    master_sheet['MAIN CODE'] = main_code(master_sheet)
+    return SharedFrame(master_sheet)
+
+
+@st.cache_resource(max_entries=4, show_spinner=False)
+def _normalized_master(signature):
+    from utils.utils import load_master_sheet, NORMALIZE_COLUMNS
+    return SharedColumns(lambda columns: load_master_sheet(columns=columns), always=NORMALIZE_COLUMNS + ['MAIN CODE'])
+
+
+@st.cache_resource(max_entries=8, show_spinner=False)
+def _allotments(years, rounds, generation):
+    from utils.allotment_store import AllotmentStore
+    metrics.mark_miss()
+    return SharedFrame(AllotmentStore().load(years=years, rounds=rounds))
+
+
+def master_view(columns=None):
+    with metrics.cache_lookup("master"):
+        master = _master(master_signature())
+    if columns is not None:
+        columns = [c for c in columns if c in master.columns]
+    return master.view(columns)
+
+
+def master_text_view():
+    # All-text master with the comparison MAIN CODE (college_course_quota)
+    with metrics.cache_lookup("master"):
+        return _master_text(master_signature()).view()
+
+
+def normalized_master_view(columns):
+    # Normalised master (see utils.normalize_master); columns load on first use
+    from utils.utils import master_columns
+    available = set(master_columns()) | {'MAIN CODE'}
+    with metrics.cache_lookup("master"):
+        return _normalized_master(master_signature()).view([c for c in columns if c in available])
+
+
+def allotments_view(years, rounds):
+    with metrics.cache_lookup("aiqr2"):
+        return _allotments(tuple(years), tuple(rounds), _allotments_generation).view()
+
+
+def allotments_generation():
+    # Bumped whenever the allotment store changes; key for results derived from it
+    return _allotments_generation
+
+
+def clear_allotments():
+    global _allotments_generation
+    _allotments_generation += 1
+    _allotments.clear()
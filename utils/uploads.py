@@ -0,0 +1,106 @@
+import hashlib
+import io
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+import streamlit as st
+
+from utils import metrics
+from utils.cache import ByteLRUCache
+from utils.excel_reader import read_excel
+
+# Uploaded workbooks are hashed and parsed once, in a background worker shared by
+# every session of this server process. Parsed frames are kept by content hash,
+# so reruns (or other users uploading the same file) skip Excel parsing entirely,
+# and a rerun that interrupts a parse re-attaches to the running job.
+
+MAX_PARSED_BYTES = 512 * 1024 * 1024
+CSV_CHUNK_ROWS = 50_000
+
+_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="upload-parse")
+_parsed = ByteLRUCache(MAX_PARSED_BYTES)
+_jobs = {}
+_lock = threading.RLock()
+
+
+class ParseJob:
+    def __init__(self, name):
+        self.name = name
+        self.progress = 0.0
+        self.message = f"Queued {name}"
+        self.future = None
+
+
+def content_hash(content):
+    return hashlib.sha256(content).hexdigest()
+
+
+def _parse(job, content, is_csv, sheet_names, dtype):
+    frames = {}
+    if is_csv:
+        # Read in chunks so progress can follow the bytes consumed
+        buffer = io.BytesIO(content)
+        chunks = []
+        for chunk in pd.read_csv(buffer, dtype=dtype, chunksize=CSV_CHUNK_ROWS):
+            chunks.append(chunk)
+            job.progress = min(buffer.tell() / max(len(content), 1), 0.99)
+            job.message = f"Parsing {job.name}: {sum(len(c) for c in chunks):,} rows"
+        frames[sheet_names[0]] = pd.concat(chunks, ignore_index=True) if chunks else pd.read_csv(io.BytesIO(content), dtype=dtype)
+        metrics.rows_processed("csv", len(frames[sheet_names[0]]))
+    else:
+        for i, sheet_name in enumerate(sheet_names):
+            job.message = f"Parsing {job.name}: sheet '{sheet_name}' ({i + 1}/{len(sheet_names)})"
+            frames[sheet_name] = read_excel(content, sheet_name=sheet_name, dtype=dtype)
+            job.progress = (i + 1) / len(sheet_names)
+    job.message = f"Parsed {job.name}"
+    return frames
+
+
+def _finish(key, future):
+    if future.exception() is None:
+        _parsed.put(key, future.result())
+    with _lock:
+        _jobs.pop(key, None)
+
+
+def submit_upload(uploaded_file, sheet_names=(0,), dtype=None):
+    # Returns (key, job); job is None when the parsed frames are already cached
+    content = uploaded_file.getvalue()
+    is_csv = uploaded_file.name.lower().endswith(".csv")
+    key = (content_hash(content), tuple(sheet_names), "csv" if is_csv else "xlsx", str(dtype))
+
+    with _lock:
+        if key in _parsed:
+            metrics.cache_result("uploads", hit=True)
+            return key, None
+        metrics.cache_result("uploads", hit=False)
+        job = _jobs.get(key)
+        if job is None:
+            job = ParseJob(uploaded_file.name)
+            _jobs[key] = job
+            job.future = _executor.submit(_parse, job, content, is_csv, list(sheet_names), dtype)
+            job.future.add_done_callback(lambda future: _finish(key, future))
+    return key, job
+
+
+def read_upload(uploaded_file, sheet_names=(0,), dtype=None):
+    # Parse in the background with a progress bar; returns {sheet name: frame}
+    key, job = submit_upload(uploaded_file, sheet_names, dtype)
+
+    if job is not None:
+        progress_bar = st.progress(0.0, text=job.message)
+        while not job.future.done():
+            progress_bar.progress(job.progress, text=job.message)
+            time.sleep(0.1)
+        progress_bar.empty()
+        frames = job.future.result()  # re-raises parse errors
+    else:
+        frames = _parsed.get(key)
+        if frames is None:
+            # Evicted between the check and the read; parse again
+            return read_upload(uploaded_file, sheet_names, dtype)
+
+    # Copy-on-write views (pandas 3): callers may edit them, the cached frames stay untouched
+    return {sheet_name: frame.copy(deep=False) for sheet_name, frame in frames.items()}
@@ -1,15 +1,40 @@
 import pandas as pd
 import os
+from utils.excel_reader import read_excel, read_header
 
 # Define the path to the MASTER EXCEL file
 MASTER_FILE = os.path.join("data", "MASTER EXCEL.xlsx")
 
-def load_master_sheet():
+# Columns normalize_master needs
+NORMALIZE_COLUMNS = ['State', 'Program', 'TYPE', 'MCC College Code', 'COURSE CODE']
+
+def master_columns():
+    from utils.master_store import get_store
+    store = get_store()
+    if store.exists():
+        return store.load().columns.tolist()
+
+    if not os.path.exists(MASTER_FILE):
+        raise FileNotFoundError(f"Master file '{MASTER_FILE}' is missing in the 'data/' folder!")
+
+    return read_header(MASTER_FILE, sheet_name='Sheet1')
+
+def read_master_sheet(columns=None):
+    # `columns` projects the read; None loads every column
+    # Prefer the versioned master store once it has been initialised
+    from utils.master_store import get_store
+    store = get_store()
+    if store.exists():
+        master_sheet = store.load().reset_index(drop=True)
+        return master_sheet if columns is None else master_sheet[list(columns)]
+
     if not os.path.exists(MASTER_FILE):
         raise FileNotFoundError(f"Master file '{MASTER_FILE}' is missing in the 'data/' folder!")
-    
-    # Load the master sheet
-    master_sheet = pd.read_excel(MASTER_FILE, sheet_name='Sheet1')
+
+    return read_excel(MASTER_FILE, sheet_name='Sheet1', columns=None if columns is None else list(columns))
+
+def normalize_master(master_sheet):
+    master_sheet = master_sheet.copy()
 
     # Normalize columns
     master_sheet['State'] = master_sheet['State'].str.strip().str.upper()
@@ -21,3 +46,29 @@ def load_master_sheet():
         master_sheet['MAIN CODE'] = master_sheet['MCC College Code'].astype(str) + "_" + master_sheet['COURSE CODE'].astype(str)
 
     return master_sheet
+
+def load_master_sheet(columns=None):
+    from utils.master_store import get_store
+    store = get_store()
+    if store.exists():
+        # Derived frame is refreshed incrementally for the keys touched by each delta
+        master_sheet = store.derived().reset_index(drop=True)
+        return master_sheet if columns is None else master_sheet[list(dict.fromkeys(list(columns) + NORMALIZE_COLUMNS + ['MAIN CODE']))]
+
+    if columns is not None:
+        available = master_columns()
+        columns = [c for c in dict.fromkeys(list(columns) + NORMALIZE_COLUMNS) if c in available]
+    return normalize_master(read_master_sheet(columns))
+
+def master_as_text(master_sheet):
+    # Mirror pd.read_excel(..., dtype=str): integral floats lose their trailing '.0'
+    text = master_sheet.copy()
+    for column in text.columns:
+        values = text[column]
+        if pd.api.types.is_float_dtype(values):
+            text[column] = values.map(lambda x: str(int(x)) if pd.notnull(x) and float(x).is_integer() else (str(x) if pd.notnull(x) else None))
+        elif pd.api.types.is_numeric_dtype(values) or pd.api.types.is_bool_dtype(values):
+            text[column] = values.astype(str)
+        else:
+            text[column] = values.map(lambda x: str(x) if pd.notnull(x) else None)
+    return text